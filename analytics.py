@@ -3,114 +3,274 @@ Analytics Module for Mental Health Chatbot
 Provides user insights, trends, and engagement metrics
 """
 
+import copy
 import sqlite3
-from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
+import threading
+from collections import Counter
+from functools import wraps
+from typing import Dict, List, Any
+import numpy as np
 from database import DB_PATH
+from cache_manager import cache
 
 
+# Per-thread read-only connection reused across analytics calls
+# (analytics never writes; the database is put in WAL mode by init_db)
+_tls = threading.local()
+
+
+def _conn() -> sqlite3.Connection:
+    """Get this thread's cached analytics connection, opening it on first use"""
+    conn = getattr(_tls, 'conn', None)
+    if conn is None:
+        conn = sqlite3.connect(f'file:{DB_PATH}?mode=ro', uri=True,
+                               check_same_thread=False, isolation_level=None)
+        conn.execute('PRAGMA mmap_size=268435456')
+        conn.execute('PRAGMA query_only=1')
+        conn.execute('PRAGMA cache_size=-20000')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        conn.row_factory = sqlite3.Row
+        _tls.conn = conn
+    return conn
+
+
+# Short-lived result cache for dashboard reads (cleared on writes via invalidate)
+ANALYTICS_CACHE_TTL = 30
+
+# Cache keys embed their owner's generation; invalidate() bumps it, so stale entries
+# are simply never looked up again and age out of the shared cache by TTL/LRU
+_generations: Dict[Any, int] = {}
+_generations_lock = threading.Lock()
+
+
+def _cached(func):
+    """Cache a per-user (or system-wide) analytics result for ANALYTICS_CACHE_TTL seconds
+    
+    Callers get their own deep copy, so mutating a result can't corrupt the cached one.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        owner = args[0] if args else kwargs.get('user_id', 'system')
+        generation = _generations.get(owner, 0)
+        key = f"analytics:{owner}:{generation}:{func.__name__}:{args[1:]}:{sorted(kwargs.items())}"
+        result = cache.get(key)
+        if result is None:
+            result = func(*args, **kwargs)
+            cache.set(key, result, ANALYTICS_CACHE_TTL)
+        return copy.deepcopy(result)
+    return wrapper
+
+
+def invalidate(user_id: int) -> None:
+    """Drop cached analytics for a user and the system-wide totals (O(1))"""
+    with _generations_lock:
+        _generations[user_id] = _generations.get(user_id, 0) + 1
+        _generations['system'] = _generations.get('system', 0) + 1
+
+
+# SQL statements, defined once so every call reuses sqlite3's statement cache
+
+_USER_SUMMARY_COLUMNS = '''
+    total_conversations, total_assessments, crisis_events,
+    last_phq9_score, last_phq9_at, last_gad7_score, last_gad7_at,
+    first_interaction, last_interaction,
+    CAST(julianday(last_interaction) - julianday(first_interaction) AS INTEGER)
+'''
+
+_SQL_USER_SUMMARY = f'''
+    SELECT {_USER_SUMMARY_COLUMNS}
+    FROM analytics_user_summary
+    WHERE user_id = ?
+'''
+
+_SQL_USER_SUMMARY_BULK = f'''
+    SELECT user_id, {_USER_SUMMARY_COLUMNS}
+    FROM analytics_user_summary
+    WHERE user_id IN ({{placeholders}})
+'''
+
+_EMPTY_USER_SUMMARY = (0, 0, 0, None, None, None, None, None, None, None)
+
+_SQL_ASSESSMENT_TRENDS = '''
+    WITH d AS (
+        SELECT score, severity, created_at,
+               ROW_NUMBER() OVER (ORDER BY created_at_i, id) AS rn,
+               COUNT(*) OVER () AS n
+        FROM assessment_results
+        WHERE user_id = ? AND assessment_type = ? AND created_at_i >= CAST(strftime('%s', 'now') AS INTEGER) - ? * 86400
+    )
+    SELECT score, severity, created_at AS date, n,
+           AVG(CASE WHEN rn > n - 3 THEN score END) OVER () AS recent_avg,
+           AVG(CASE WHEN rn <= 3 THEN score END) OVER () AS older_avg
+    FROM d
+    ORDER BY rn
+'''
+
+_SQL_TREND_SUMMARY = '''
+    WITH d AS (
+        SELECT score,
+               ROW_NUMBER() OVER (ORDER BY created_at_i, id) AS rn,
+               COUNT(*) OVER () AS n
+        FROM assessment_results
+        WHERE user_id = ? AND assessment_type = ?
+          AND created_at_i >= CAST(strftime('%s', 'now') AS INTEGER) - ? * 86400
+    )
+    SELECT COUNT(*),
+           AVG(CASE WHEN rn > n - 3 THEN score END),
+           AVG(CASE WHEN rn <= 3 THEN score END)
+    FROM d
+'''
+
+_SQL_CRISIS_EVENTS = '''
+    SELECT crisis_level AS level, severity, created_at AS date
+    FROM crisis_events
+    WHERE user_id = ? AND created_at_i >= CAST(strftime('%s', 'now') AS INTEGER) - ? * 86400
+    ORDER BY created_at_i DESC
+'''
+
+_SQL_CRISIS_TRIGGERS = '''
+    WITH RECURSIVE split(event_rank, pos, tok, rest) AS (
+        SELECT ROW_NUMBER() OVER (ORDER BY created_at_i DESC), 0, '', triggers || ','
+        FROM crisis_events
+        WHERE user_id = ? AND created_at_i >= CAST(strftime('%s', 'now') AS INTEGER) - ? * 86400 AND triggers != ''
+        UNION ALL
+        SELECT event_rank, pos + 1,
+               substr(rest, 1, instr(rest, ',') - 1),
+               substr(rest, instr(rest, ',') + 1)
+        FROM split
+        WHERE rest != ''
+    )
+    SELECT trim(tok, char(32, 9, 10, 11, 12, 13)) AS "trigger", COUNT(*) AS count
+    FROM split
+    WHERE "trigger" != ''
+    GROUP BY "trigger"
+    ORDER BY count DESC, MIN(event_rank * 1000 + pos)
+    LIMIT 5
+'''
+
+_SQL_DAILY_MESSAGES = '''
+    SELECT DATE(created_at) AS date, COUNT(*) AS messages
+    FROM chat_history
+    WHERE user_id = ? AND created_at_i >= CAST(strftime('%s', 'now') AS INTEGER) - 7 * 86400
+    GROUP BY 1
+    ORDER BY 1 ASC
+'''
+
+# Recent-message count is capped at 50, same as counting a LIMIT 50 fetch
+_SQL_MESSAGE_TOTALS = '''
+    SELECT MIN(total_conversations, 50),
+           CAST(total_message_chars AS REAL) / NULLIF(total_conversations, 0)
+    FROM analytics_user_summary
+    WHERE user_id = ?
+'''
+
+_SQL_BULK_ACTIVE_DAYS = '''
+    SELECT user_id, COUNT(DISTINCT DATE(created_at))
+    FROM chat_history
+    WHERE user_id IN ({placeholders}) AND created_at_i >= CAST(strftime('%s', 'now') AS INTEGER) - 7 * 86400
+    GROUP BY user_id
+'''
+
+_SQL_BULK_MESSAGE_TOTALS = '''
+    SELECT user_id, MIN(total_conversations, 50),
+           CAST(total_message_chars AS REAL) / NULLIF(total_conversations, 0)
+    FROM analytics_user_summary
+    WHERE user_id IN ({placeholders})
+'''
+
+_SQL_SYSTEM_COUNTERS = '''
+    SELECT total_users, total_conversations, total_assessments, total_crises
+    FROM analytics_counters
+    WHERE id = 1
+'''
+
+_SQL_ACTIVE_USERS = '''
+    SELECT COUNT(*) FROM users
+    WHERE last_seen_at >= datetime('now', '-7 days')
+'''
+
+_SQL_TOP_SEVERITY = '''
+    SELECT severity, COUNT(*) as count
+    FROM assessment_results
+    GROUP BY severity
+    ORDER BY count DESC
+    LIMIT 1
+'''
+
+# One row per requested assessment type (count plus first/last three
+# averages), then a 'crisis' row carrying the crisis-event count
+_SQL_TRENDS_MULTI = '''
+    WITH d AS (
+        SELECT assessment_type, score,
+               ROW_NUMBER() OVER (PARTITION BY assessment_type ORDER BY created_at_i, id) AS rn,
+               COUNT(*) OVER (PARTITION BY assessment_type) AS n
+        FROM assessment_results
+        WHERE user_id = ? AND assessment_type IN ({placeholders})
+          AND created_at_i >= CAST(strftime('%s', 'now') AS INTEGER) - ? * 86400
+    )
+    SELECT assessment_type, MAX(n),
+           AVG(CASE WHEN rn > n - 3 THEN score END),
+           AVG(CASE WHEN rn <= 3 THEN score END)
+    FROM d
+    GROUP BY assessment_type
+    UNION ALL
+    SELECT 'crisis', COUNT(*), NULL, NULL
+    FROM crisis_events
+    WHERE user_id = ? AND created_at_i >= CAST(strftime('%s', 'now') AS INTEGER) - ? * 86400
+'''
+
+
+@_cached
 def get_user_stats(user_id: int) -> Dict[str, Any]:
     """Get comprehensive user statistics"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    # Total conversations
-    cursor.execute('''
-        SELECT COUNT(*) FROM chat_history WHERE user_id = ?
-    ''', (user_id,))
-    total_conversations = cursor.fetchone()[0]
-    
-    # Total assessments
-    cursor.execute('''
-        SELECT COUNT(*) FROM assessment_results WHERE user_id = ?
-    ''', (user_id,))
-    total_assessments = cursor.fetchone()[0]
-    
-    # Crisis events
-    cursor.execute('''
-        SELECT COUNT(*) FROM crisis_events WHERE user_id = ?
-    ''', (user_id,))
-    crisis_count = cursor.fetchone()[0]
-    
-    # Latest PHQ-9 score
-    cursor.execute('''
-        SELECT score, created_at FROM assessment_results
-        WHERE user_id = ? AND assessment_type = 'phq9'
-        ORDER BY created_at DESC LIMIT 1
-    ''', (user_id,))
-    latest_phq9 = cursor.fetchone()
-    
-    # Latest GAD-7 score
-    cursor.execute('''
-        SELECT score, created_at FROM assessment_results
-        WHERE user_id = ? AND assessment_type = 'gad7'
-        ORDER BY created_at DESC LIMIT 1
-    ''', (user_id,))
-    latest_gad7 = cursor.fetchone()
-    
-    # First interaction
-    cursor.execute('''
-        SELECT MIN(created_at) FROM chat_history WHERE user_id = ?
-    ''', (user_id,))
-    first_interaction = cursor.fetchone()[0]
-    
-    # Last interaction
-    cursor.execute('''
-        SELECT MAX(created_at) FROM chat_history WHERE user_id = ?
-    ''', (user_id,))
-    last_interaction = cursor.fetchone()[0]
-    
-    conn.close()
+    cursor = _conn().cursor()
+    
+    # Pre-aggregated by triggers on the base tables (see database.init_db)
+    cursor.execute(_SQL_USER_SUMMARY, (user_id,))
+    return _user_stats_from_row(user_id, cursor.fetchone() or _EMPTY_USER_SUMMARY)
+
+
+def get_user_stats_bulk(user_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    """get_user_stats for many users in one query, keyed by user_id"""
+    if not user_ids:
+        return {}
+    
+    cursor = _conn().cursor()
+    placeholders = ','.join('?' * len(user_ids))
+    cursor.execute(_SQL_USER_SUMMARY_BULK.format(placeholders=placeholders), user_ids)
+    rows = {row[0]: row[1:] for row in cursor.fetchall()}
     
     return {
-        'user_id': user_id,
-        'total_conversations': total_conversations,
-        'total_assessments': total_assessments,
-        'crisis_events': crisis_count,
-        'latest_phq9': {
-            'score': latest_phq9[0] if latest_phq9 else None,
-            'date': latest_phq9[1] if latest_phq9 else None
-        },
-        'latest_gad7': {
-            'score': latest_gad7[0] if latest_gad7 else None,
-            'date': latest_gad7[1] if latest_gad7 else None
-        },
-        'first_interaction': first_interaction,
-        'last_interaction': last_interaction,
-        'days_active': _calculate_days_active(first_interaction, last_interaction)
+        user_id: _user_stats_from_row(user_id, rows.get(user_id, _EMPTY_USER_SUMMARY))
+        for user_id in user_ids
     }
 
 
-def get_assessment_trends(user_id: int, assessment_type: str, days: int = 30) -> List[Dict[str, Any]]:
-    """Get assessment score trends over time"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    since_date = (datetime.now() - timedelta(days=days)).isoformat()
+def get_assessment_trends(user_id: int, assessment_type: str, days: int = 30,
+                          include_data: bool = True) -> List[Dict[str, Any]]:
+    """Get assessment score trends over time (include_data=False skips the per-row list)"""
+    cursor = _conn().cursor()
+    
+    if not include_data:
+        cursor.execute(_SQL_TREND_SUMMARY, (user_id, assessment_type, days))
+        count, recent_avg, older_avg = cursor.fetchone()
+        return {
+            'assessment_type': assessment_type,
+            'trend_direction': _trend_from_averages(count, recent_avg, older_avg),
+            'total_assessments': count
+        }
     
-    cursor.execute('''
-        SELECT score, severity, created_at
-        FROM assessment_results
-        WHERE user_id = ? AND assessment_type = ? AND created_at >= ?
-        ORDER BY created_at ASC
-    ''', (user_id, assessment_type, since_date))
+    # Rows in time order; the first/last three averages ride along as
+    # window aggregates so the trend needs no Python-side arithmetic
+    cursor.execute(_SQL_ASSESSMENT_TRENDS, (user_id, assessment_type, days))
     
     results = cursor.fetchall()
-    conn.close()
-    
-    trends = []
-    for score, severity, timestamp in results:
-        trends.append({
-            'score': score,
-            'severity': severity,
-            'date': timestamp
-        })
-    
-    # Calculate trend direction
-    if len(trends) >= 2:
-        recent_avg = sum(t['score'] for t in trends[-3:]) / min(3, len(trends[-3:]))
-        older_avg = sum(t['score'] for t in trends[:3]) / min(3, len(trends[:3]))
-        trend_direction = 'improving' if recent_avg < older_avg else 'worsening' if recent_avg > older_avg else 'stable'
+    
+    trends = [{'score': r['score'], 'severity': r['severity'], 'date': r['date']} for r in results]
+    
+    if results:
+        first = results[0]
+        trend_direction = _trend_from_averages(first['n'], first['recent_avg'], first['older_avg'])
     else:
         trend_direction = 'insufficient_data'
     
@@ -124,20 +284,11 @@ def get_assessment_trends(user_id: int, assessment_type: str, days: int = 30) ->
 
 def get_crisis_patterns(user_id: int, days: int = 30) -> Dict[str, Any]:
     """Analyze crisis event patterns"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    since_date = (datetime.now() - timedelta(days=days)).isoformat()
+    cursor = _conn().cursor()
     
-    cursor.execute('''
-        SELECT crisis_level, severity, triggers, created_at
-        FROM crisis_events
-        WHERE user_id = ? AND created_at >= ?
-        ORDER BY created_at DESC
-    ''', (user_id, since_date))
+    cursor.execute(_SQL_CRISIS_EVENTS, (user_id, days))
     
     events = cursor.fetchall()
-    conn.close()
     
     if not events:
         return {
@@ -148,92 +299,85 @@ def get_crisis_patterns(user_id: int, days: int = 30) -> Dict[str, Any]:
         }
     
     # Analyze severity distribution
-    severity_counts = {}
-    all_triggers = []
-    
-    for level, severity, triggers, timestamp in events:
-        severity_counts[level] = severity_counts.get(level, 0) + 1
-        if triggers:
-            all_triggers.extend(triggers.split(','))
-    
-    # Count trigger frequency
-    trigger_counts = {}
-    for trigger in all_triggers:
-        trigger = trigger.strip()
-        if trigger:
-            trigger_counts[trigger] = trigger_counts.get(trigger, 0) + 1
-    
-    # Sort triggers by frequency
-    common_triggers = sorted(
-        trigger_counts.items(),
-        key=lambda x: x[1],
-        reverse=True
-    )[:5]
+    severity_counts = dict(Counter(e['level'] for e in events))
+    
+    # Top 5 triggers: split the comma-separated lists in SQL and count there.
+    # Ties keep first-seen order (newest event first, then list position).
+    cursor.execute(_SQL_CRISIS_TRIGGERS, (user_id, days))
+    common_triggers = cursor.fetchall()
     
     return {
         'total_events': len(events),
         'severity_distribution': severity_counts,
-        'common_triggers': [{'trigger': t[0], 'count': t[1]} for t in common_triggers],
-        'recent_events': [
-            {
-                'level': e[0],
-                'severity': e[1],
-                'date': e[3]
-            } for e in events[:5]
-        ]
+        'common_triggers': [dict(t) for t in common_triggers],
+        'recent_events': [dict(e) for e in events[:5]]
     }
 
 
+@_cached
 def get_engagement_metrics(user_id: int) -> Dict[str, Any]:
     """Calculate user engagement metrics"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    cursor = _conn().cursor()
     
     # Messages per day (last 7 days)
-    cursor.execute('''
-        SELECT DATE(created_at) as day, COUNT(*) as count
-        FROM chat_history
-        WHERE user_id = ? AND created_at >= datetime('now', '-7 days')
-        GROUP BY day
-        ORDER BY day ASC
-    ''', (user_id,))
+    cursor.execute(_SQL_DAILY_MESSAGES, (user_id,))
     
     daily_messages = cursor.fetchall()
     
-    # Average message length
-    cursor.execute('''
-        SELECT AVG(LENGTH(message)) FROM chat_history WHERE user_id = ?
-    ''', (user_id,))
-    avg_message_length = cursor.fetchone()[0] or 0
-    
-    # Response sentiment (basic keyword analysis)
-    cursor.execute('''
-        SELECT message FROM chat_history WHERE user_id = ? ORDER BY created_at DESC LIMIT 50
-    ''', (user_id,))
-    recent_messages = cursor.fetchall()
-    
-    conn.close()
+    # Recent message count and average message length, without
+    # pulling any message bodies into Python
+    cursor.execute(_SQL_MESSAGE_TOTALS, (user_id,))
+    recent_count, avg_message_length = cursor.fetchone() or (0, None)
+    avg_message_length = avg_message_length or 0
     
     # Calculate engagement score (0-100)
     engagement_score = _calculate_engagement_score(
-        len(recent_messages),
+        recent_count,
         daily_messages,
         avg_message_length
     )
     
     return {
         'engagement_score': engagement_score,
-        'daily_activity': [{'date': day, 'messages': count} for day, count in daily_messages],
+        'daily_activity': [dict(r) for r in daily_messages],
         'avg_message_length': round(avg_message_length, 2),
-        'total_recent_messages': len(recent_messages)
+        'total_recent_messages': recent_count
     }
 
 
+def get_engagement_scores(user_ids: List[int]) -> Dict[int, int]:
+    """Engagement score (0-100) for many users at once, for batch reporting"""
+    if not user_ids:
+        return {}
+    
+    cursor = _conn().cursor()
+    index = {user_id: i for i, user_id in enumerate(user_ids)}
+    placeholders = ','.join('?' * len(user_ids))
+    
+    recent_counts = np.zeros(len(user_ids), dtype=np.int64)
+    active_days = np.zeros(len(user_ids), dtype=np.int64)
+    avg_lengths = np.zeros(len(user_ids), dtype=np.float64)
+    
+    cursor.execute(_SQL_BULK_ACTIVE_DAYS.format(placeholders=placeholders), user_ids)
+    for user_id, days in cursor.fetchall():
+        active_days[index[user_id]] = days
+    
+    cursor.execute(_SQL_BULK_MESSAGE_TOTALS.format(placeholders=placeholders), user_ids)
+    for user_id, recent, avg_length in cursor.fetchall():
+        recent_counts[index[user_id]] = recent
+        avg_lengths[index[user_id]] = avg_length or 0
+    
+    scores = _calculate_engagement_scores(recent_counts, active_days, avg_lengths)
+    return dict(zip(user_ids, scores.tolist()))
+
+
+@_cached
 def get_mental_health_trajectory(user_id: int) -> Dict[str, Any]:
     """Calculate overall mental health trajectory"""
-    phq9_trends = get_assessment_trends(user_id, 'phq9', days=90)
-    gad7_trends = get_assessment_trends(user_id, 'gad7', days=90)
-    crisis_data = get_crisis_patterns(user_id, days=90)
+    directions, crisis_count = _fetch_trends_multi(user_id, ('phq9', 'gad7'), days=90)
+    phq9_trends = {'trend_direction': directions['phq9']}
+    gad7_trends = {'trend_direction': directions['gad7']}
+    crisis_data = {'total_events': crisis_count}
     
     # Calculate trajectory score (0-100, higher is better)
     trajectory_score = _calculate_trajectory_score(phq9_trends, gad7_trends, crisis_data)
@@ -247,46 +391,23 @@ def get_mental_health_trajectory(user_id: int) -> Dict[str, Any]:
     }
 
 
+@_cached
 def get_system_analytics() -> Dict[str, Any]:
     """Get system-wide analytics (admin view)"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    # Total users
-    cursor.execute('SELECT COUNT(*) FROM users')
-    total_users = cursor.fetchone()[0]
-    
-    # Total conversations
-    cursor.execute('SELECT COUNT(*) FROM chat_history')
-    total_conversations = cursor.fetchone()[0]
+    cursor = _conn().cursor()
     
-    # Total assessments
-    cursor.execute('SELECT COUNT(*) FROM assessment_results')
-    total_assessments = cursor.fetchone()[0]
-    
-    # Total crisis events
-    cursor.execute('SELECT COUNT(*) FROM crisis_events')
-    total_crises = cursor.fetchone()[0]
+    # Row counts maintained by triggers (see database.init_db)
+    cursor.execute(_SQL_SYSTEM_COUNTERS)
+    total_users, total_conversations, total_assessments, total_crises = cursor.fetchone()
     
     # Active users (last 7 days)
-    cursor.execute('''
-        SELECT COUNT(DISTINCT user_id) FROM chat_history
-        WHERE created_at >= datetime('now', '-7 days')
-    ''')
+    cursor.execute(_SQL_ACTIVE_USERS)
     active_users = cursor.fetchone()[0]
     
     # Most common assessment severity
-    cursor.execute('''
-        SELECT severity, COUNT(*) as count
-        FROM assessment_results
-        GROUP BY severity
-        ORDER BY count DESC
-        LIMIT 1
-    ''')
+    cursor.execute(_SQL_TOP_SEVERITY)
     most_common_severity = cursor.fetchone()
     
-    conn.close()
-    
     return {
         'total_users': total_users,
         'active_users_7d': active_users,
@@ -300,14 +421,55 @@ def get_system_analytics() -> Dict[str, Any]:
 
 # Helper functions
 
-def _calculate_days_active(first_date: Optional[str], last_date: Optional[str]) -> int:
-    """Calculate days between first and last interaction"""
-    if not first_date or not last_date:
-        return 0
+def _user_stats_from_row(user_id: int, row) -> Dict[str, Any]:
+    """Shape an analytics_user_summary row into the user stats response"""
+    (total_conversations, total_assessments, crisis_count,
+     phq9_score, phq9_date, gad7_score, gad7_date,
+     first_interaction, last_interaction, days_active) = row
+    
+    return {
+        'user_id': user_id,
+        'total_conversations': total_conversations,
+        'total_assessments': total_assessments,
+        'crisis_events': crisis_count,
+        'latest_phq9': {
+            'score': phq9_score,
+            'date': phq9_date
+        },
+        'latest_gad7': {
+            'score': gad7_score,
+            'date': gad7_date
+        },
+        'first_interaction': first_interaction,
+        'last_interaction': last_interaction,
+        'days_active': days_active or 0
+    }
+
+
+def _fetch_trends_multi(user_id: int, types, days: int = 90):
+    """Trend direction for each assessment type, plus the crisis count, in one query"""
+    cursor = _conn().cursor()
+    
+    sql = _SQL_TRENDS_MULTI.format(placeholders=','.join('?' * len(types)))
+    cursor.execute(sql, (user_id, *types, days, user_id, days))
+    
+    directions = {assessment_type: 'insufficient_data' for assessment_type in types}
+    crisis_count = 0
+    for kind, count, recent_avg, older_avg in cursor.fetchall():
+        if kind == 'crisis':
+            crisis_count = count
+        else:
+            directions[kind] = _trend_from_averages(count, recent_avg, older_avg)
+    
+    return directions, crisis_count
+
+
+def _trend_from_averages(count: int, recent_avg: float, older_avg: float) -> str:
+    """Label the trend from the recent and older score averages"""
+    if count < 2:
+        return 'insufficient_data'
     
-    first = datetime.fromisoformat(first_date)
-    last = datetime.fromisoformat(last_date)
-    return (last - first).days
+    return 'improving' if recent_avg < older_avg else 'worsening' if recent_avg > older_avg else 'stable'
 
 
 def _calculate_engagement_score(total_messages: int, daily_activity: List, avg_length: float) -> int:
@@ -320,6 +482,17 @@ def _calculate_engagement_score(total_messages: int, daily_activity: List, avg_l
     return round(message_score + consistency_score + depth_score)
 
 
+def _calculate_engagement_scores(total_messages: np.ndarray, active_days: np.ndarray,
+                                 avg_lengths: np.ndarray) -> np.ndarray:
+    """Vectorized _calculate_engagement_score over per-user arrays"""
+    message_score = np.minimum(total_messages * 2, 40)
+    consistency_score = np.minimum(active_days * 10, 40)
+    depth_score = np.minimum(avg_lengths / 10, 20)
+    
+    # np.rint rounds half to even, like the builtin round()
+    return np.rint(message_score + consistency_score + depth_score).astype(np.int64)
+
+
 def _calculate_trajectory_score(phq9_data: Dict, gad7_data: Dict, crisis_data: Dict) -> int:
     """Calculate mental health trajectory score (0-100, higher is better)"""
     score = 50  # Start at neutral
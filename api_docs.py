@@ -3,8 +3,14 @@ API Documentation Generator for Mental Health Chatbot
 Implements OpenAPI/Swagger specification for all endpoints
 """
 
-from flask import Blueprint, jsonify, render_template_string
-from typing import Dict, List
+from flask import Blueprint, Response, request, current_app
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, Iterator, List, Mapping, Tuple
+import gzip
+import hashlib
+import os
+import orjson
 
 # Create Blueprint for API docs
 api_docs_bp = Blueprint('api_docs', __name__)
@@ -143,6 +149,46 @@ All errors return JSON with `error` field and appropriate HTTP status code.
                 }
             }
         },
+        "/ask/stream": {
+            "post": {
+                "tags": ["Chat"],
+                "summary": "Send Chat Message (Streaming)",
+                "description": "Same as /ask, but the answer is always streamed as Server-Sent Events: a 'token' event per chunk as the LLM generates it, then a 'done' event carrying the full response and the /ask result fields.",
+                "requestBody": {
+                    "required": True,
+                    "content": {
+                        "application/x-www-form-urlencoded": {
+                            "schema": {
+                                "type": "object",
+                                "required": ["query"],
+                                "properties": {
+                                    "query": {
+                                        "type": "string",
+                                        "description": "User message to the chatbot",
+                                        "example": "What helps with panic attacks?"
+                                    },
+                                    "chat_session_id": {
+                                        "type": "integer",
+                                        "description": "Chat session the exchange belongs to"
+                                    }
+                                }
+                            }
+                        }
+                    }
+                },
+                "responses": {
+                    "200": {
+                        "description": "Event stream of tokens followed by a final 'done' event",
+                        "content": {
+                            "text/event-stream": {
+                                "example": "data: {\"type\": \"token\", \"content\": \"Panic attacks\"}\n\ndata: {\"type\": \"done\", \"response\": \"Panic attacks...\", \"crisis_detected\": false, \"cached\": false}\n\n"
+                            }
+                        }
+                    },
+                    "500": {"description": "Internal server error"}
+                }
+            }
+        },
         "/api/assessment/phq9": {
             "get": {
                 "tags": ["Assessments"],
@@ -465,11 +511,7 @@ All errors return JSON with `error` field and appropriate HTTP status code.
                         "required": True,
                         "schema": {"type": "string", "enum": ["phq9", "gad7"]}
                     },
-                    {
-                        "name": "days",
-                        "in": "query",
-                        "schema": {"type": "integer", "default": 30}
-                    }
+                    {"$ref": "#/components/parameters/Days"}
                 ],
                 "responses": {
                     "200": {"description": "Trend data"}
@@ -482,7 +524,7 @@ All errors return JSON with `error` field and appropriate HTTP status code.
                 "summary": "Get Crisis Patterns",
                 "description": "Analyze crisis event patterns",
                 "parameters": [
-                    {"name": "days", "in": "query", "schema": {"type": "integer", "default": 30}}
+                    {"$ref": "#/components/parameters/Days"}
                 ],
                 "responses": {
                     "200": {"description": "Crisis patterns"}
@@ -537,7 +579,7 @@ All errors return JSON with `error` field and appropriate HTTP status code.
                 "summary": "Get Sentiment Trends",
                 "description": "Get sentiment analysis trends over time",
                 "parameters": [
-                    {"name": "days", "in": "query", "schema": {"type": "integer", "default": 30}}
+                    {"$ref": "#/components/parameters/Days"}
                 ],
                 "responses": {
                     "200": {"description": "Sentiment trends"}
@@ -663,6 +705,13 @@ All errors return JSON with `error` field and appropriate HTTP status code.
                 }
             }
         },
+        "parameters": {
+            "Days": {
+                "name": "days",
+                "in": "query",
+                "schema": {"type": "integer", "default": 30}
+            }
+        },
         "securitySchemes": {
             "sessionAuth": {
                 "type": "apiKey",
@@ -674,14 +723,60 @@ All errors return JSON with `error` field and appropriate HTTP status code.
 }
 
 
+# ========== Spec validation ==========
+
+# Opt-in (CI/dev) check against the OpenAPI 3.0 schema; needs openapi-spec-validator
+OPENAPI_VALIDATION_MARKER = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'openapi.valid')
+
+
+def _validate_spec_once() -> None:
+    """Validate OPENAPI_SPEC at import, skipping it when this exact spec already passed"""
+    spec_hash = hashlib.sha256(orjson.dumps(OPENAPI_SPEC, option=orjson.OPT_SORT_KEYS)).hexdigest()
+    try:
+        with open(OPENAPI_VALIDATION_MARKER) as f:
+            if f.read().strip() == spec_hash:
+                return
+    except FileNotFoundError:
+        pass
+    
+    try:
+        from openapi_spec_validator import validate
+    except ImportError:
+        print("⚠ MINDSPACE_VALIDATE_OPENAPI is set but openapi-spec-validator is not installed")
+        return
+    
+    try:
+        validate(OPENAPI_SPEC)
+    except Exception as e:
+        print(f"✗ OpenAPI spec validation failed: {e}")
+        return
+    
+    os.makedirs(os.path.dirname(OPENAPI_VALIDATION_MARKER), exist_ok=True)
+    with open(OPENAPI_VALIDATION_MARKER, 'w') as f:
+        f.write(spec_hash)
+    print("✓ OpenAPI spec validated")
+
+
+if os.getenv('MINDSPACE_VALIDATE_OPENAPI') == '1':
+    _validate_spec_once()
+
+
 # ========== Swagger UI HTML ==========
 
+# Pinned swagger-ui-dist release; the Docker build downloads it into
+# static/swagger/, otherwise the page falls back to the unpkg CDN
+SWAGGER_UI_VERSION = '5.17.14'
+SWAGGER_UI_CDN = f'https://unpkg.com/swagger-ui-dist@{SWAGGER_UI_VERSION}'
+SWAGGER_UI_STATIC_DIR = 'swagger'
+SWAGGER_UI_ASSETS = ('swagger-ui.css', 'swagger-ui-bundle.js')
+_SWAGGER_ASSET_BASE = '__SWAGGER_ASSET_BASE__'
+
 SWAGGER_UI_HTML = """
 <!DOCTYPE html>
 <html>
 <head>
     <title>MindSpace API Documentation</title>
-    <link rel="stylesheet" type="text/css" href="https://unpkg.com/swagger-ui-dist@5/swagger-ui.css">
+    <link rel="stylesheet" type="text/css" href="__SWAGGER_ASSET_BASE__/swagger-ui.css">
     <style>
         body { margin: 0; padding: 0; }
         .swagger-ui .topbar { display: none; }
@@ -690,7 +785,7 @@ SWAGGER_UI_HTML = """
 </head>
 <body>
     <div id="swagger-ui"></div>
-    <script src="https://unpkg.com/swagger-ui-dist@5/swagger-ui-bundle.js"></script>
+    <script src="__SWAGGER_ASSET_BASE__/swagger-ui-bundle.js"></script>
     <script>
         window.onload = function() {
             SwaggerUIBundle({
@@ -710,40 +805,129 @@ SWAGGER_UI_HTML = """
 """
 
 
+# Shared default for operations without tags (serializes as [])
+_EMPTY_TAGS = ()
+
+
+def _iter_endpoints() -> Iterator[Dict]:
+    """Yield one listing entry per operation in OPENAPI_SPEC['paths']"""
+    paths = OPENAPI_SPEC['paths'].items()
+    return (
+        {
+            'method': method.upper(),
+            'path': path,
+            'summary': details.get('summary', ''),
+            'tags': details.get('tags', _EMPTY_TAGS)
+        }
+        for path, methods in paths
+        for method, details in methods.items()
+        if method != 'parameters'
+    )
+
+
+def _build_endpoint_index() -> Dict:
+    """Flatten OPENAPI_SPEC['paths'] into the /endpoints listing"""
+    endpoints = list(_iter_endpoints())
+    
+    return {
+        'total_endpoints': len(endpoints),
+        'endpoints': endpoints
+    }
+
+
+def _encode_static(body: bytes) -> Tuple[bytes, bytes, str]:
+    """(body, gzipped body, ETag) for a static payload"""
+    return body, gzip.compress(body, compresslevel=9), hashlib.md5(body).hexdigest()
+
+
+# Serialized/compressed bodies are built on first request rather than at
+# import (gzip -9 dominates the cost), then reused for the process lifetime
+
+@lru_cache(maxsize=1)
+def _openapi_artifacts() -> Tuple[bytes, bytes, str]:
+    """Spec as compact JSON (same key order as jsonify)"""
+    return _encode_static(orjson.dumps(OPENAPI_SPEC, option=orjson.OPT_SORT_KEYS))
+
+
+@lru_cache(maxsize=1)
+def _endpoints_artifacts() -> Tuple[bytes, bytes, str]:
+    """Endpoint listing as compact JSON"""
+    return _encode_static(orjson.dumps(_build_endpoint_index()))
+
+
+@lru_cache(maxsize=1)
+def _endpoints_ndjson_artifacts() -> Tuple[bytes, bytes, str]:
+    """Endpoint listing as newline-delimited JSON, one endpoint per line"""
+    return _encode_static(b''.join(orjson.dumps(e, option=orjson.OPT_APPEND_NEWLINE)
+                                   for e in _iter_endpoints()))
+
+
+@lru_cache(maxsize=2)
+def _swagger_artifacts(asset_base: str) -> Tuple[bytes, bytes, str]:
+    """Swagger UI page pointing at asset_base (plain string substitution, no Jinja rendering)"""
+    return _encode_static(SWAGGER_UI_HTML.replace(_SWAGGER_ASSET_BASE, asset_base).encode('utf-8'))
+
+
+@lru_cache(maxsize=4)
+def _local_swagger_base(static_folder: str, static_url_path: str):
+    """URL prefix of locally hosted Swagger UI assets, or None if they are not installed"""
+    asset_dir = os.path.join(static_folder, SWAGGER_UI_STATIC_DIR)
+    if all(os.path.isfile(os.path.join(asset_dir, name)) for name in SWAGGER_UI_ASSETS):
+        return f'{static_url_path}/{SWAGGER_UI_STATIC_DIR}'
+    return None
+
+
+def _static_response(artifacts: Tuple[bytes, bytes, str], mimetype: str, max_age: int) -> Response:
+    """Response for a precomputed body (pre-gzipped when accepted), answering If-None-Match with 304"""
+    body, gz_body, etag = artifacts
+    if request.accept_encodings['gzip']:
+        resp = Response(gz_body, mimetype=mimetype)
+        resp.headers['Content-Encoding'] = 'gzip'
+        etag = f'{etag}-gz'
+    else:
+        resp = Response(body, mimetype=mimetype)
+    resp.vary.add('Accept-Encoding')
+    resp.set_etag(etag)
+    resp.cache_control.public = True
+    resp.cache_control.max_age = max_age
+    return resp.make_conditional(request)
+
+
 # ========== Routes ==========
 
 @api_docs_bp.route('/')
 def swagger_ui():
     """Render Swagger UI"""
-    return render_template_string(SWAGGER_UI_HTML)
+    local_base = _local_swagger_base(current_app.static_folder, current_app.static_url_path)
+    resp = _static_response(_swagger_artifacts(local_base or SWAGGER_UI_CDN), 'text/html', max_age=3600)
+    if local_base:
+        resp.headers['Link'] = (
+            f'<{local_base}/swagger-ui-bundle.js>; rel=preload; as=script, '
+            f'<{local_base}/swagger-ui.css>; rel=preload; as=style'
+        )
+    return resp
 
 
 @api_docs_bp.route('/openapi.json')
 def openapi_spec():
     """Return OpenAPI specification"""
-    return jsonify(OPENAPI_SPEC)
+    return _static_response(_openapi_artifacts(), 'application/json', max_age=86400)
 
 
 @api_docs_bp.route('/endpoints')
 def list_endpoints():
-    """List all API endpoints"""
-    endpoints = []
-    for path, methods in OPENAPI_SPEC['paths'].items():
-        for method, details in methods.items():
-            if method != 'parameters':
-                endpoints.append({
-                    'method': method.upper(),
-                    'path': path,
-                    'summary': details.get('summary', ''),
-                    'tags': details.get('tags', [])
-                })
-    
-    return jsonify({
-        'total_endpoints': len(endpoints),
-        'endpoints': endpoints
-    })
+    """List all API endpoints (as NDJSON when the client asks for application/x-ndjson)"""
+    if request.accept_mimetypes.best_match(['application/json', 'application/x-ndjson']) == 'application/x-ndjson':
+        resp = _static_response(_endpoints_ndjson_artifacts(), 'application/x-ndjson', max_age=86400)
+    else:
+        resp = _static_response(_endpoints_artifacts(), 'application/json', max_age=86400)
+    resp.vary.add('Accept')
+    return resp
+
+
+_API_DOCUMENTATION = MappingProxyType(OPENAPI_SPEC)
 
 
-def get_api_documentation():
-    """Return API documentation dict"""
-    return OPENAPI_SPEC
+def get_api_documentation() -> Mapping:
+    """Return a read-only view of the API documentation dict"""
+    return _API_DOCUMENTATION
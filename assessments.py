@@ -135,6 +135,11 @@ class GAD7Assessment:
             }
 
 
+# Highest possible totals (every answer "Nearly every day" = 3)
+PHQ9_MAX = 3 * len(PHQ9Assessment.QUESTIONS)
+GAD7_MAX = 3 * len(GAD7Assessment.QUESTIONS)
+
+
 # Utility functions
 def get_assessment_by_type(assessment_type):
     """Get assessment class by type"""
@@ -145,18 +150,50 @@ def get_assessment_by_type(assessment_type):
     return assessments.get(assessment_type.lower())
 
 
+def _make_scorer(expected_length, low=0, high=3):
+    """Build a scorer that validates and totals an answers list in a single pass
+    
+    The scorer returns (score, "Valid"), or (None, error message) for invalid answers.
+    """
+    def score(answers):
+        if len(answers) != expected_length:
+            return None, f"Expected {expected_length} answers, got {len(answers)}"
+        
+        total = 0
+        for i, answer in enumerate(answers):
+            if not isinstance(answer, int) or answer < low or answer > high:
+                return None, f"Answer {i+1} must be an integer between {low} and {high}"
+            total += answer
+        
+        return total, "Valid"
+    return score
+
+
+def _make_validator(expected_length, low=0, high=3):
+    """Build an answers validator with the questionnaire's length and answer range baked in"""
+    score = _make_scorer(expected_length, low, high)
+    
+    def validate(answers):
+        total, message = score(answers)
+        return total is not None, message
+    return validate
+
+
+# Specialized per-questionnaire scorers/validators; handlers call these directly
+score_phq9_answers = _make_scorer(len(PHQ9Assessment.QUESTIONS))
+score_gad7_answers = _make_scorer(len(GAD7Assessment.QUESTIONS))
+validate_phq9_answers = _make_validator(len(PHQ9Assessment.QUESTIONS))
+validate_gad7_answers = _make_validator(len(GAD7Assessment.QUESTIONS))
+
+_VALIDATORS = {
+    "phq9": validate_phq9_answers,
+    "gad7": validate_gad7_answers
+}
+
+
 def validate_answers(answers, assessment_type):
     """Validate that answers are in correct format and range"""
-    assessment_class = get_assessment_by_type(assessment_type)
-    if not assessment_class:
+    validator = _VALIDATORS.get(assessment_type.lower())
+    if not validator:
         return False, "Invalid assessment type"
-    
-    expected_length = len(assessment_class.QUESTIONS)
-    if len(answers) != expected_length:
-        return False, f"Expected {expected_length} answers, got {len(answers)}"
-    
-    for i, answer in enumerate(answers):
-        if not isinstance(answer, int) or answer < 0 or answer > 3:
-            return False, f"Answer {i+1} must be an integer between 0 and 3"
-    
-    return True, "Valid"
+    return validator(answers)
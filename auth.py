@@ -10,7 +10,7 @@ import re
 from datetime import datetime, timedelta
 from typing import Dict, Optional, Tuple
 from functools import wraps
-from flask import session, request, jsonify
+from flask import session, request, jsonify, g, current_app
 
 from database import DB_PATH
 from error_handler import logger
@@ -617,6 +617,26 @@ def login_required(f):
     return decorated_function
 
 
+def require_auth(f):
+    """
+    Decorator to require a logged-in user, exposing their id as g.user_id.
+    Requests without a session cookie are rejected before the session is
+    deserialized, so anonymous traffic skips the signature check entirely.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if current_app.config['SESSION_COOKIE_NAME'] not in request.cookies:
+            return jsonify({'error': 'Not authenticated'}), 401
+        
+        user_id = session.get('user_id')
+        if not user_id:
+            return jsonify({'error': 'Not authenticated'}), 401
+        
+        g.user_id = user_id
+        return f(*args, **kwargs)
+    return decorated_function
+
+
 def admin_required(f):
     """Decorator to require admin privileges (placeholder for future)"""
     @wraps(f)
@@ -664,6 +684,7 @@ def delete_user_account(user_id: int, password: str) -> Dict:
         cursor.execute('DELETE FROM chat_history WHERE user_id = ?', (user_id,))
         cursor.execute('DELETE FROM crisis_events WHERE user_id = ?', (user_id,))
         cursor.execute('DELETE FROM sentiment_history WHERE user_id = ?', (user_id,))
+        cursor.execute('DELETE FROM analytics_user_summary WHERE user_id = ?', (user_id,))
         cursor.execute('DELETE FROM users WHERE id = ?', (user_id,))
         cursor.execute('DELETE FROM users_auth WHERE id = ?', (user_id,))
         
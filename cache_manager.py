@@ -3,27 +3,43 @@ Cache Manager for Mental Health Chatbot
 Implements in-memory caching with TTL for LLM responses and database queries
 """
 
+import os
 import time
 import hashlib
-from typing import Any, Optional, Dict
+import threading
+from typing import Any, Optional, Dict, List, Tuple
 from functools import wraps
 import json
+from collections import OrderedDict
+
+import numpy as np
+import orjson
+
+try:
+    import redis  # optional: shared cache across worker processes (REDIS_URL)
+except ImportError:
+    redis = None
 
 
 class CacheManager:
-    """Simple in-memory cache with time-to-live (TTL)"""
+    """Bounded in-memory cache with time-to-live (TTL) and LRU eviction"""
     
-    def __init__(self, default_ttl: int = 3600):
+    def __init__(self, default_ttl: int = 3600, max_size: int = 10000):
         """
         Initialize cache manager
         
         Args:
             default_ttl: Default time-to-live in seconds (default: 1 hour)
+            max_size: Maximum number of entries; the least recently used is evicted beyond it
         """
-        self.cache: Dict[str, Dict[str, Any]] = {}
+        # Ordered oldest -> most recently used
+        self.cache: Dict[str, Dict[str, Any]] = OrderedDict()
         self.default_ttl = default_ttl
+        self.max_size = max_size
         self.hits = 0
         self.misses = 0
+        self.evictions = 0
+        self._lock = threading.RLock()
     
     def _generate_key(self, prefix: str, data: Any) -> str:
         """Generate cache key from data"""
@@ -36,51 +52,60 @@ class CacheManager:
     
     def get(self, key: str) -> Optional[Any]:
         """Get value from cache if not expired"""
-        if key in self.cache:
-            entry = self.cache[key]
-            if time.time() < entry['expires_at']:
-                self.hits += 1
-                return entry['value']
-            else:
-                # Expired, remove it
-                del self.cache[key]
-        
-        self.misses += 1
-        return None
+        with self._lock:
+            entry = self.cache.get(key)
+            if entry is not None:
+                if time.time() < entry['expires_at']:
+                    self.cache.move_to_end(key)
+                    self.hits += 1
+                    return entry['value']
+                else:
+                    # Expired, remove it
+                    del self.cache[key]
+            
+            self.misses += 1
+            return None
     
     def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
         """Set value in cache with TTL"""
         if ttl is None:
             ttl = self.default_ttl
         
-        self.cache[key] = {
-            'value': value,
-            'expires_at': time.time() + ttl,
-            'created_at': time.time()
-        }
+        now = time.time()
+        with self._lock:
+            self.cache[key] = {
+                'value': value,
+                'expires_at': now + ttl,
+                'created_at': now
+            }
+            self.cache.move_to_end(key)
+            while len(self.cache) > self.max_size:
+                self.cache.popitem(last=False)
+                self.evictions += 1
     
     def delete(self, key: str) -> bool:
         """Delete key from cache"""
-        if key in self.cache:
-            del self.cache[key]
-            return True
-        return False
+        with self._lock:
+            return self.cache.pop(key, None) is not None
     
     def clear(self) -> None:
         """Clear all cache entries"""
-        self.cache.clear()
-        self.hits = 0
-        self.misses = 0
+        with self._lock:
+            self.cache.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
     
     def cleanup_expired(self) -> int:
         """Remove expired entries, return count of removed items"""
         current_time = time.time()
-        expired_keys = [
-            key for key, entry in self.cache.items()
-            if current_time >= entry['expires_at']
-        ]
-        for key in expired_keys:
-            del self.cache[key]
+        with self._lock:
+            expired_keys = [
+                key for key, entry in self.cache.items()
+                if current_time >= entry['expires_at']
+            ]
+            for key in expired_keys:
+                del self.cache[key]
         return len(expired_keys)
     
     def get_stats(self) -> Dict[str, Any]:
@@ -90,15 +115,125 @@ class CacheManager:
         
         return {
             'size': len(self.cache),
+            'max_size': self.max_size,
             'hits': self.hits,
             'misses': self.misses,
+            'evictions': self.evictions,
             'hit_rate': f"{hit_rate:.2f}%",
             'total_requests': total_requests
         }
 
 
+class SemanticCache:
+    """Response cache keyed on query meaning rather than exact text
+    
+    Queries are embedded with the app's sentence-embedding model and L2-normalized, so a
+    lookup is one matrix-vector product over the stored rows; the closest entry is a hit
+    when its cosine similarity reaches the threshold. Entries expire after a TTL and the
+    least recently used row is evicted once max_entries is reached.
+    """
+    
+    def __init__(self, embeddings, threshold: float = 0.87, max_entries: int = 1000,
+                 default_ttl: int = 1800):
+        """
+        Initialize semantic cache
+        
+        Args:
+            embeddings: LangChain embeddings object (anything with embed_query)
+            threshold: Minimum cosine similarity for a cache hit
+            max_entries: Maximum number of cached responses
+            default_ttl: Default time-to-live in seconds (default: 30 minutes)
+        """
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+        self._matrix: Optional[np.ndarray] = None  # (n, dim) float32, rows L2-normalized
+        self._expires_at = np.empty(0, dtype=np.float64)
+        self._last_used = np.empty(0, dtype=np.float64)
+        self._entries: List[Tuple[str, str]] = []  # (query, response) per matrix row
+        self._lock = threading.RLock()
+    
+    def _embed(self, query: str) -> np.ndarray:
+        vec = np.asarray(self.embeddings.embed_query(query), dtype=np.float32)
+        return vec / max(float(np.linalg.norm(vec)), 1e-12)
+    
+    def _remove_rows(self, rows) -> None:
+        self._matrix = np.delete(self._matrix, rows, axis=0)
+        self._expires_at = np.delete(self._expires_at, rows)
+        self._last_used = np.delete(self._last_used, rows)
+        for row in sorted(np.atleast_1d(rows), reverse=True):
+            del self._entries[row]
+    
+    def get(self, query: str) -> Optional[str]:
+        """Get the response cached for the most similar unexpired query, if similar enough"""
+        q_vec = self._embed(query)  # model call stays outside the lock
+        now = time.time()
+        with self._lock:
+            if self._entries:
+                scores = self._matrix @ q_vec
+                scores[self._expires_at <= now] = -np.inf
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    self._last_used[best] = now
+                    self.hits += 1
+                    return self._entries[best][1]
+            
+            self.misses += 1
+            return None
+    
+    def set(self, query: str, response: str, ttl: Optional[int] = None) -> None:
+        """Cache a response for a query, evicting expired then least recently used rows"""
+        if ttl is None:
+            ttl = self.default_ttl
+        
+        q_vec = self._embed(query)
+        now = time.time()
+        with self._lock:
+            if self._entries:
+                expired = np.flatnonzero(self._expires_at <= now)
+                if expired.size:
+                    self._remove_rows(expired)
+            if self._entries and len(self._entries) >= self.max_entries:
+                self._remove_rows(int(np.argmin(self._last_used)))
+            
+            if self._entries:
+                self._matrix = np.vstack([self._matrix, q_vec])
+            else:
+                self._matrix = q_vec[np.newaxis, :]
+            self._expires_at = np.append(self._expires_at, now + ttl)
+            self._last_used = np.append(self._last_used, now)
+            self._entries.append((query, response))
+    
+    def clear(self) -> None:
+        """Clear all cache entries"""
+        with self._lock:
+            self._matrix = None
+            self._expires_at = np.empty(0, dtype=np.float64)
+            self._last_used = np.empty(0, dtype=np.float64)
+            self._entries = []
+            self.hits = 0
+            self.misses = 0
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        total_requests = self.hits + self.misses
+        hit_rate = (self.hits / total_requests * 100) if total_requests > 0 else 0
+        
+        return {
+            'size': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': f"{hit_rate:.2f}%",
+            'total_requests': total_requests,
+            'threshold': self.threshold
+        }
+
+
 # Global cache instance
-cache = CacheManager(default_ttl=1800)  # 30 minutes default
+cache = CacheManager(default_ttl=1800, max_size=10000)  # 30 minutes default
 
 
 def cached_response(prefix: str, ttl: Optional[int] = None):
@@ -134,18 +269,6 @@ def cached_response(prefix: str, ttl: Optional[int] = None):
     return decorator
 
 
-def cache_llm_response(query: str, response: str, ttl: int = 1800) -> None:
-    """Cache LLM response for a query"""
-    key = cache._generate_key('llm', query)
-    cache.set(key, response, ttl)
-
-
-def get_cached_llm_response(query: str) -> Optional[str]:
-    """Get cached LLM response for a query"""
-    key = cache._generate_key('llm', query)
-    return cache.get(key)
-
-
 def cache_assessment_result(user_id: int, assessment_type: str, result: Dict, ttl: int = 3600) -> None:
     """Cache assessment result"""
     key = cache._generate_key('assessment', {'user_id': user_id, 'type': assessment_type})
@@ -158,12 +281,73 @@ def get_cached_assessment(user_id: int, assessment_type: str) -> Optional[Dict]:
     return cache.get(key)
 
 
-def invalidate_user_cache(user_id: int) -> None:
-    """Invalidate all cache entries for a user"""
-    # This is a simple implementation - in production, use key prefixes
-    keys_to_delete = [
-        key for key in cache.cache.keys()
-        if f"user_id': {user_id}" in str(cache.cache[key])
-    ]
-    for key in keys_to_delete:
-        cache.delete(key)
+# ========== Shared (Redis) cache ==========
+# Set REDIS_URL to share entries between gunicorn workers. Data that must not go stale
+# across workers (e.g. user profiles, which the user edits) is only cached when Redis
+# is configured; without it, callers simply go to the database.
+
+USER_CACHE_TTL = 300  # seconds
+USER_EMAIL_CACHE_TTL = 600  # emails rarely change
+
+
+def _create_redis_client():
+    url = os.getenv("REDIS_URL")
+    if not url:
+        return None
+    if redis is None:
+        print("⚠ REDIS_URL is set but the redis package is not installed - shared cache disabled")
+        return None
+    # from_url sets up a connection pool; redis-py resets it in forked workers
+    return redis.Redis.from_url(url)
+
+
+redis_client = _create_redis_client()
+
+
+def _redis_get(key: str) -> Any:
+    if redis_client is None:
+        return None
+    try:
+        raw = redis_client.get(key)
+    except redis.RedisError:
+        return None
+    return orjson.loads(raw) if raw else None
+
+
+def _redis_set(key: str, value: Any, ttl: int) -> None:
+    if redis_client is None:
+        return
+    try:
+        redis_client.setex(key, ttl, orjson.dumps(value))
+    except redis.RedisError:
+        pass
+
+
+def get_cached_user(user_id: int) -> Optional[Dict]:
+    """Get a user's cached profile from Redis (None if absent or Redis isn't configured)"""
+    return _redis_get(f"u:{user_id}")
+
+
+def cache_user(user_id: int, profile: Dict, ttl: int = USER_CACHE_TTL) -> None:
+    """Cache a user's profile in Redis (no-op without Redis)"""
+    _redis_set(f"u:{user_id}", profile, ttl)
+
+
+def get_cached_user_email(user_id: int) -> Optional[str]:
+    """Get a user's cached email address from Redis"""
+    return _redis_get(f"u:email:{user_id}")
+
+
+def cache_user_email(user_id: int, email: str, ttl: int = USER_EMAIL_CACHE_TTL) -> None:
+    """Cache a user's email address in Redis (no-op without Redis)"""
+    _redis_set(f"u:email:{user_id}", email, ttl)
+
+
+def invalidate_user(user_id: int) -> None:
+    """Drop everything cached for a user after their account changes"""
+    if redis_client is None:
+        return
+    try:
+        redis_client.delete(f"u:{user_id}", f"u:email:{user_id}")
+    except redis.RedisError:
+        pass
@@ -6,7 +6,21 @@ from langchain_classic.prompts import PromptTemplate
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_groq import ChatGroq
 from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_core.embeddings import Embeddings
+import chromadb
+from langchain_classic.embeddings import CacheBackedEmbeddings
+from langchain_classic.storage import LocalFileStore
+from concurrent.futures import (Future, ThreadPoolExecutor, wait, FIRST_COMPLETED,
+                                TimeoutError as FuturesTimeout)
+from queue import Queue, Empty
+from threading import Thread
+from typing import List
+from functools import lru_cache
+import httpx
 import os
+import sqlite3
+import time
+import numpy as np
 
 from dotenv import load_dotenv
 load_dotenv()
@@ -35,7 +49,20 @@ User said: {question}
 Serene:"""
 
 
-def initialize_llm():
+# One keep-alive connection pool to the Groq API shared by every ChatGroq in the process
+# (one per QAChainPool slot, plus the per-request streaming LLMs in streaming.py), so a
+# request reuses a warm TLS connection instead of opening its own. Built on first use, so
+# each gunicorn worker creates its own rather than inheriting the master's. Timeouts
+# match the Groq SDK defaults.
+@lru_cache(maxsize=1)
+def get_groq_http_client() -> httpx.Client:
+    return httpx.Client(
+        limits=httpx.Limits(max_keepalive_connections=20, max_connections=100),
+        timeout=httpx.Timeout(60.0, connect=5.0)
+    )
+
+
+def initialize_llm(verbose=True):
     """Initialize dual LLM system with Groq as primary and Gemini as fallback"""
     try:
         # Primary LLM: Groq (LLaMA-3.3 70B) with higher temperature for natural conversation
@@ -43,9 +70,11 @@ def initialize_llm():
             temperature=0.7,
             groq_api_key=os.getenv("GROQ_API_KEY"),
             model_name="llama-3.3-70b-versatile",
-            max_tokens=500  # Enough for helpful advice
+            max_tokens=500,  # Enough for helpful advice
+            http_client=get_groq_http_client()
         )
-        print("✓ Primary LLM initialized: Groq (LLaMA-3.3 70B)")
+        if verbose:
+            print("✓ Primary LLM initialized: Groq (LLaMA-3.3 70B)")
         
         # Secondary LLM: Google Gemini 2.5 Flash
         gemini_api_key = os.getenv("GEMINI_API_KEY")
@@ -56,10 +85,12 @@ def initialize_llm():
                 temperature=0.7,
                 max_output_tokens=500
             )
-            print("✓ Secondary LLM initialized: Google Gemini 2.5 Flash")
+            if verbose:
+                print("✓ Secondary LLM initialized: Google Gemini 2.5 Flash")
         else:
             gemini_llm = None
-            print("⚠ Gemini API key not configured - running with Groq only")
+            if verbose:
+                print("⚠ Gemini API key not configured - running with Groq only")
         
         return groq_llm, gemini_llm
     except Exception as e:
@@ -68,49 +99,157 @@ def initialize_llm():
 
 
 class DualLLMChain:
-    """Wrapper class to handle dual LLM with automatic fallback and conversation history"""
-    def __init__(self, primary_chain, secondary_chain=None):
+    """Wrapper class to handle dual LLM with automatic fallback and conversation history
+    
+    With a secondary chain, run() hedges: if the primary hasn't answered within
+    `hedge_delay` seconds (LLM_HEDGE_DELAY, default 3; 0 = query both at once) or
+    fails, the secondary is started too and the first good answer wins.
+    """
+    def __init__(self, primary_chain, secondary_chain=None, hedge_delay=None, executor=None):
         self.primary_chain = primary_chain
         self.secondary_chain = secondary_chain
         self.primary_failures = 0
+        self.hedge_delay = float(os.getenv("LLM_HEDGE_DELAY", "3")) if hedge_delay is None else hedge_delay
+        # Not used as a context manager: a losing call keeps running in the background
+        # and must not hold up the response. QAChainPool passes one executor shared by all chains
+        if secondary_chain and executor is None:
+            executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='llm-hedge')
+        self._executor = executor if secondary_chain else None
         
-    def run(self, query, conversation_history=""):
-        """Try primary LLM first, fallback to secondary if it fails
+    def run(self, query, conversation_history="", return_sources=False):
+        """Try primary LLM first, hedging with (or falling back to) the secondary
         
         Args:
             query: The user's current message (may already include context)
             conversation_history: Formatted string of previous conversation turns (prepended to query)
+            return_sources: Also return the retrieved documents the answer was built from,
+                as (response, source_documents) - taken from the same retrieval, not a second search
         """
-        # Prepend conversation history to the query if provided
-        if conversation_history and conversation_history.strip() and "No previous conversation" not in conversation_history:
-            full_query = f"""[CONVERSATION HISTORY - Use this context to provide continuity:
-{conversation_history}
-]
-
-NOW RESPONDING TO: {query}"""
+        full_query = self._with_history(query, conversation_history)
+        
+        if self.secondary_chain:
+            response, sources = self._run_hedged(full_query)
         else:
-            full_query = query
+            try:
+                response, sources = self._invoke(self.primary_chain, full_query)
+                self.primary_failures = 0  # Reset failure counter on success
+            except Exception as primary_error:
+                print(f"⚠ Primary LLM (Groq) failed: {primary_error}")
+                self.primary_failures += 1
+                response, sources = self._get_fallback_response(), []
         
+        return (response, sources) if return_sources else response
+    
+    def _invoke(self, chain, full_query):
+        result = chain.invoke({"query": full_query})
+        return self._clean_response(result["result"]), result["source_documents"]
+    
+    def _run_hedged(self, full_query):
+        primary = self._executor.submit(self._invoke, self.primary_chain, full_query)
         try:
-            # Try primary LLM (Groq)
-            response = self.primary_chain.run(full_query)
-            self.primary_failures = 0  # Reset failure counter on success
-            return self._clean_response(response)
+            result = primary.result(timeout=self.hedge_delay)
+            self.primary_failures = 0
+            return result
+        except FuturesTimeout:
+            print(f"→ Primary LLM (Groq) slower than {self.hedge_delay}s, also asking Gemini...")
         except Exception as primary_error:
             print(f"⚠ Primary LLM (Groq) failed: {primary_error}")
+            print("→ Switching to secondary LLM (Gemini)...")
             self.primary_failures += 1
-            
-            # Fallback to secondary LLM (Gemini)
-            if self.secondary_chain:
+            primary = None
+        
+        secondary = self._executor.submit(self._invoke, self.secondary_chain, full_query)
+        pending = {f for f in (primary, secondary) if f is not None}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
                 try:
-                    print("→ Switching to secondary LLM (Gemini)...")
-                    response = self.secondary_chain.run(full_query)
-                    return self._clean_response(response)
-                except Exception as secondary_error:
-                    print(f"✗ Secondary LLM (Gemini) also failed: {secondary_error}")
-                    return self._get_fallback_response()
-            else:
-                return self._get_fallback_response()
+                    result = future.result()
+                except Exception as error:
+                    if future is primary:
+                        print(f"⚠ Primary LLM (Groq) failed: {error}")
+                        self.primary_failures += 1
+                    else:
+                        print(f"✗ Secondary LLM (Gemini) failed: {error}")
+                    continue
+                if future is primary:
+                    self.primary_failures = 0
+                # Best effort: only drops the loser if it hasn't started yet
+                for loser in pending:
+                    loser.cancel()
+                return result
+        
+        return self._get_fallback_response(), []
+    
+    def stream(self, query, conversation_history=""):
+        """Like run(), but yield the answer text incrementally as the LLM produces it
+        
+        Falls back to the secondary LLM only if the primary fails before producing any
+        text; once tokens have been sent the answer can't be swapped mid-stream.
+        """
+        full_query = self._with_history(query, conversation_history)
+        
+        chains = [self.primary_chain] + ([self.secondary_chain] if self.secondary_chain else [])
+        for i, chain in enumerate(chains):
+            started = False
+            try:
+                for text in self._stream_chain(chain, full_query):
+                    started = True
+                    yield text
+                if i == 0:
+                    self.primary_failures = 0
+                return
+            except Exception as e:
+                print(f"⚠ {'Primary' if i == 0 else 'Secondary'} LLM streaming failed: {e}")
+                if i == 0:
+                    self.primary_failures += 1
+                if started:
+                    return
+        
+        yield self._get_fallback_response()
+    
+    def _stream_chain(self, chain, full_query):
+        """Stream one RetrievalQA chain: retrieve, stuff the prompt, then stream LLM tokens"""
+        llm_chain = chain.combine_documents_chain.llm_chain
+        docs = chain.retriever.invoke(full_query)
+        prompt = llm_chain.prompt.format(
+            context="\n\n".join(doc.page_content for doc in docs),
+            question=full_query
+        )
+        
+        # Hold back the first few characters so a role prefix can be stripped
+        head = ""
+        for chunk in llm_chain.llm.stream(prompt):
+            if head is None:
+                if chunk.content:
+                    yield chunk.content
+                continue
+            head += chunk.content
+            if len(head) >= 16:
+                yield self._strip_prefixes(head)
+                head = None
+        if head:
+            yield self._strip_prefixes(head)
+    
+    @staticmethod
+    def _with_history(query, conversation_history):
+        """Prepend conversation history to the query if provided"""
+        if conversation_history and conversation_history.strip() and "No previous conversation" not in conversation_history:
+            return f"""[CONVERSATION HISTORY - Use this context to provide continuity:
+{conversation_history}
+]
+
+NOW RESPONDING TO: {query}"""
+        return query
+    
+    @staticmethod
+    def _strip_prefixes(text):
+        """Remove any "Assistant:" or "Chatbot:" prefixes the model might add"""
+        text = text.lstrip()
+        for prefix in ["Assistant:", "Chatbot:", "MindSpace:", "Serene:", "Bot:", "Response:"]:
+            if text.startswith(prefix):
+                text = text[len(prefix):].lstrip()
+        return text
     
     def _clean_response(self, response):
         """Clean up the response for better presentation"""
@@ -137,20 +276,352 @@ NOW RESPONDING TO: {query}"""
         return random.choice(fallbacks)
 
 
-def create_vector_db():
+class QAChainPool:
+    """Fixed pool of independent DualLLMChains shared by request threads
+    
+    Each slot has its own LLM clients (and connection pools) over the shared vector
+    store, so concurrent requests don't contend on one chain. run() borrows a chain
+    for the duration of one call; callers use it like a single DualLLMChain.
+    """
+    
+    def __init__(self, vector_db, size):
+        self.size = size
+        self._chains = Queue()
+        # One hedging executor for the whole pool instead of one per chain: a hedged call
+        # runs two LLM requests, plus room for losers still finishing in the background
+        self._hedge_executor = ThreadPoolExecutor(max_workers=4 * size, thread_name_prefix='llm-hedge')
+        for i in range(size):
+            primary_llm, secondary_llm = initialize_llm(verbose=(i == 0))
+            self.primary_available = primary_llm is not None
+            self.secondary_available = secondary_llm is not None
+            self._chains.put(DualLLMChain(
+                setup_qa_chain(vector_db, primary_llm),
+                setup_qa_chain(vector_db, secondary_llm) if secondary_llm else None,
+                executor=self._hedge_executor
+            ))
+    
+    def run(self, query, conversation_history="", return_sources=False):
+        chain = self._chains.get()
+        try:
+            return chain.run(query, conversation_history=conversation_history, return_sources=return_sources)
+        finally:
+            self._chains.put(chain)
+    
+    def stream(self, query, conversation_history=""):
+        """Stream an answer; the chain stays borrowed until the generator finishes or is closed"""
+        chain = self._chains.get()
+        try:
+            yield from chain.stream(query, conversation_history=conversation_history)
+        finally:
+            self._chains.put(chain)
+
+
+CHROMA_DB_PATH = 'chroma_db'
+CHROMA_COLLECTION = 'langchain'  # langchain's default, used by the existing persisted store
+
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+ONNX_MODEL_DIR = os.path.join('models', 'all-MiniLM-L6-v2-onnx-int8')
+EMBEDDING_CACHE_DIR = 'emb_cache'
+FAISS_INDEX_PATH = 'faiss_index'
+# Queries are short and indexed chunks are ~500 chars (~110 tokens), so cap the
+# sequence length below MiniLM's 256 to bound padding cost for long outliers
+EMBEDDING_MAX_SEQ_LENGTH = 128
+
+
+class ORTEmbeddings(Embeddings):
+    """MiniLM sentence embeddings served by ONNX Runtime from a dynamically INT8-quantized export
+    
+    The first run exports the model to ONNX and quantizes it into ONNX_MODEL_DIR; later
+    runs load the quantized model directly. Output matches the sentence-transformers
+    pipeline for this model (mean pooling + L2 normalization).
+    """
+    
+    def __init__(self, model_name: str = EMBEDDING_MODEL, model_dir: str = ONNX_MODEL_DIR):
+        import onnxruntime
+        from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTQuantizer
+        from optimum.onnxruntime.configuration import AutoQuantizationConfig
+        from transformers import AutoTokenizer
+        
+        quantized_file = 'model_quantized.onnx'
+        if not os.path.exists(os.path.join(model_dir, quantized_file)):
+            print("→ Exporting embedding model to ONNX (INT8)...")
+            model = ORTModelForFeatureExtraction.from_pretrained(model_name, export=True)
+            quantizer = ORTQuantizer.from_pretrained(model)
+            quantizer.quantize(
+                save_dir=model_dir,
+                quantization_config=AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=False)
+            )
+            AutoTokenizer.from_pretrained(model_name).save_pretrained(model_dir)
+        
+        session_options = onnxruntime.SessionOptions()
+        session_options.intra_op_num_threads = os.cpu_count() or 1
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.model = ORTModelForFeatureExtraction.from_pretrained(
+            model_dir, file_name=quantized_file, session_options=session_options
+        )
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        inputs = self.tokenizer(texts, padding=True, truncation=True,
+                                max_length=EMBEDDING_MAX_SEQ_LENGTH, return_tensors='np')
+        hidden = self.model(**inputs).last_hidden_state
+        
+        # Mean pooling over real tokens, then L2 normalize
+        mask = inputs['attention_mask'][..., None].astype(hidden.dtype)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled.tolist()
+    
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+def _create_base_embeddings():
+    """(embedding model, backend name) - EMBEDDINGS_BACKEND=onnx opts into ORTEmbeddings"""
+    if os.getenv("EMBEDDINGS_BACKEND", "").lower() == "onnx":
+        try:
+            embeddings = ORTEmbeddings()
+            print("✓ Embeddings: ONNX Runtime (INT8)")
+            return embeddings, 'onnx-int8'
+        except ImportError as e:
+            print(f"⚠ ONNX embeddings unavailable ({e}) - using HuggingFace")
+    
+    import torch
+    torch.set_num_threads(int(os.environ.get("OMP_NUM_THREADS", os.cpu_count() or 1)))
+    try:
+        torch.set_num_interop_threads(2)
+    except RuntimeError:
+        pass  # inter-op pool already started (torch used elsewhere first)
+    device = 'cuda' if torch.cuda.is_available() else 'cpu'
+    
+    # Unit-length vectors (like the ONNX path) make similarity a plain dot product for
+    # Chroma and the semantic cache; 64-chunk batches speed up indexing
+    embeddings = HuggingFaceEmbeddings(
+        model_name=EMBEDDING_MODEL,
+        model_kwargs={'device': device},
+        encode_kwargs={'normalize_embeddings': True, 'batch_size': 64}
+    )
+    backend = 'hf'
+    model = getattr(embeddings, '_client', None) or getattr(embeddings, 'client', None)
+    if model is not None:
+        model.max_seq_length = EMBEDDING_MAX_SEQ_LENGTH
+        if device == 'cuda':
+            # fp16 halves weight memory/bandwidth on GPU; vectors differ slightly from
+            # fp32, hence the separate embedding cache namespace
+            model.half()
+            backend = 'hf-cuda-fp16'
+        if os.getenv("EMBEDDINGS_TORCH_COMPILE") == "1":
+            _compile_sentence_transformer(model, embeddings)
+        elif device == 'cuda':
+            embeddings.embed_documents(["warmup"])  # CUDA context + kernels before the first query
+        print(f"✓ Embeddings: HuggingFace on {device}")
+    return embeddings, backend
+
+
+def _compile_sentence_transformer(model, embeddings):
+    """torch.compile the transformer and trigger compilation now rather than on the first query
+    
+    dynamic=True avoids a recompile for every new batch/sequence shape; the default
+    mode is used because 'reduce-overhead' relies on CUDA graphs.
+    """
+    import torch
+    eager_model = model[0].auto_model
+    try:
+        model[0].auto_model = torch.compile(eager_model, dynamic=True)
+        embeddings.embed_documents(["warmup"])  # compilation happens on the first call
+        print("✓ Embedding model compiled with torch.compile")
+    except Exception as e:
+        model[0].auto_model = eager_model
+        print(f"⚠ torch.compile unavailable for embeddings ({e}) - using eager mode")
+
+
+def create_embeddings() -> Embeddings:
+    """Embedding function for the vector store
+    
+    Document-chunk vectors are persisted in a local file store so re-indexing skips the
+    model. User queries are deliberately not persisted (they are private and unbounded);
+    they go through the query batcher, and repeated questions are served by the
+    semantic response cache instead.
+    """
+    embeddings, backend = _create_base_embeddings()
+    return CacheBackedEmbeddings.from_bytes_store(
+        BatchingEmbeddings(embeddings),
+        LocalFileStore(EMBEDDING_CACHE_DIR),
+        namespace=f"minilm-l6-v2-{backend}-{EMBEDDING_MAX_SEQ_LENGTH}",
+        query_embedding_cache=False,
+        key_encoder="blake2b"
+    )
+
+
+class BatchingEmbeddings(Embeddings):
+    """Embeddings wrapper that coalesces concurrent embed_query calls into one batched encode
+    
+    Each caller blocks on a Future while a background worker collects queries for up to
+    `window_ms` (or `max_batch` items) and embeds them together with embed_documents.
+    """
+    
+    def __init__(self, embeddings: Embeddings, max_batch: int = 16, window_ms: float = 10):
+        self.embeddings = embeddings
+        self.max_batch = max_batch
+        self.window = window_ms / 1000
+        self._queue = Queue()
+        self._worker = Thread(target=self._run, name='embedding-batcher', daemon=True)
+        self._worker.start()
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Document embedding is already batched; pass straight through"""
+        return self.embeddings.embed_documents(texts)
+    
+    def embed_query(self, text: str) -> List[float]:
+        """Queue the query for the next batch and wait for its vector"""
+        future = Future()
+        self._queue.put((text, future))
+        return future.result()
+    
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            
+            # Keep collecting until the window closes or the batch is full
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except Empty:
+                    break
+            
+            try:
+                vectors = self.embeddings.embed_documents([text for text, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            
+            for (_, future), vector in zip(batch, vectors):
+                future.set_result(vector)
+
+
+def load_document_chunks():
+    """The PDFs in data/, split into ~500 character chunks for indexing"""
     loader = DirectoryLoader('data/', glob="*.pdf", loader_cls=PyPDFLoader)
     documents = loader.load()
     text_splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
-    texts = text_splitter.split_documents(documents)
-    embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-    vector_db = Chroma.from_documents(texts, embeddings, persist_directory='chroma_db')
-    vector_db.persist()
+    return text_splitter.split_documents(documents)
+
+
+def create_vector_db(embeddings=None, client=None):
+    """Index the PDFs in data/ into Chroma, reusing `embeddings` if given
+    
+    Writes to the local chroma_db/ store, or to `client` (a Chroma server) if given.
+    """
+    texts = load_document_chunks()
+    if embeddings is None:
+        embeddings = create_embeddings()
+    if client is not None:
+        vector_db = Chroma.from_documents(texts, embeddings, client=client, collection_name=CHROMA_COLLECTION)
+    else:
+        vector_db = Chroma.from_documents(texts, embeddings, persist_directory=CHROMA_DB_PATH)
+        vector_db.persist()
 
     print("Created and data sent")
 
     return vector_db
 
 
+def open_faiss_db(embeddings, index_path=FAISS_INDEX_PATH):
+    """Open (building it on first run) an in-process FAISS index over data/
+    
+    Vectors are unit length, so the index is an exact inner-product (IndexFlatIP)
+    search, which ranks the same as cosine similarity. With FAISS_INDEX=sq8 a new
+    index stores each dimension as an 8-bit scalar instead (4x smaller, scanned with
+    the same inner product); an existing saved index is loaded as whatever type it is.
+    """
+    from langchain_community.vectorstores import FAISS
+    from langchain_community.vectorstores.utils import DistanceStrategy
+    
+    if os.path.exists(os.path.join(index_path, 'index.faiss')):
+        vector_db = FAISS.load_local(
+            index_path, embeddings,
+            distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT,
+            allow_dangerous_deserialization=True  # our own index, written by save_local below
+        )
+    else:
+        vector_db = FAISS.from_documents(
+            load_document_chunks(), embeddings,
+            distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT
+        )
+        if os.getenv("FAISS_INDEX", "").lower() == "sq8":
+            vector_db.index = _quantize_faiss_index(vector_db.index)
+        vector_db.save_local(index_path)
+        print("Created and data sent")
+    return vector_db
+
+
+def _quantize_faiss_index(flat_index):
+    """Re-encode a flat inner-product index as an 8-bit scalar-quantized one (same ids/order)"""
+    import faiss
+    vectors = flat_index.reconstruct_n(0, flat_index.ntotal)
+    index = faiss.IndexScalarQuantizer(
+        flat_index.d, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT
+    )
+    index.train(vectors)  # learns the per-dimension value ranges
+    index.add(vectors)
+    return index
+
+
+def open_vector_db(embeddings):
+    """Open (building it on first run) the vector store
+    
+    With CHROMA_HOST set the store is a Chroma server (`chroma run --path chroma_db`),
+    keeping index access out of the web process; VECTOR_STORE=faiss opts into an
+    in-process FAISS index (needs faiss-cpu); otherwise it is the embedded persistent
+    store in chroma_db/.
+    """
+    if os.getenv("VECTOR_STORE", "").lower() == "faiss":
+        try:
+            vector_db = open_faiss_db(embeddings)
+            print("✓ Vector store: FAISS (inner product)")
+            return vector_db
+        except ImportError as e:
+            print(f"⚠ FAISS unavailable ({e}) - using Chroma")
+    
+    chroma_host = os.getenv("CHROMA_HOST")
+    if chroma_host:
+        client = chromadb.HttpClient(host=chroma_host, port=int(os.getenv("CHROMA_PORT", "8000")))
+        vector_db = Chroma(client=client, collection_name=CHROMA_COLLECTION, embedding_function=embeddings)
+        if not vector_db.get(limit=1)['ids']:
+            vector_db = create_vector_db(embeddings, client=client)
+        print(f"✓ Vector store: Chroma server at {chroma_host}")
+        return vector_db
+    
+    if not os.path.exists(CHROMA_DB_PATH):
+        return create_vector_db(embeddings)
+    tune_chroma_sqlite(CHROMA_DB_PATH)
+    return Chroma(persist_directory=CHROMA_DB_PATH, embedding_function=embeddings)
+
+
+def tune_chroma_sqlite(persist_directory):
+    """Switch Chroma's SQLite store to WAL before the store is opened
+    
+    chromadb 1.x manages its SQLite connections in its Rust core, so per-connection
+    pragmas (synchronous, mmap_size, temp_store) can't be applied from Python; the
+    journal mode is persisted in the file itself, so readers stop blocking behind writes.
+    """
+    db_file = os.path.join(persist_directory, 'chroma.sqlite3')
+    if not os.path.exists(db_file):
+        return
+    try:
+        conn = sqlite3.connect(db_file, timeout=1)
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        print(f"⚠ Could not enable WAL on {db_file}: {e}")
+
+
 def setup_qa_chain(vector_db, llm):
     """Setup QA chain for a given LLM with enhanced mental health prompt"""
     retriever = vector_db.as_retriever(
@@ -171,7 +642,7 @@ def setup_qa_chain(vector_db, llm):
         chain_type_kwargs={
             "prompt": PROMPT,
         },
-        return_source_documents=False
+        return_source_documents=True  # one retrieval feeds both the prompt and callers' logging
     )
 
     return qa_chain
@@ -190,12 +661,7 @@ def main():
         return
 
     # Setup vector database
-    db_path = 'chroma_db'
-    if not os.path.exists(db_path):
-        vector_db = create_vector_db()
-    else:
-        embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-        vector_db = Chroma(persist_directory=db_path, embedding_function=embeddings)
+    vector_db = open_vector_db(create_embeddings())
 
     # Create QA chains for both LLMs
     print("=" * 60)
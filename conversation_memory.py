@@ -178,17 +178,31 @@ class ConversationContextBuilder:
         return memory.get_context()
     
     @staticmethod
-    def get_personalized_prompt(user_id: int, base_query: str) -> str:
-        """Generate personalized prompt with user context and conversation history"""
-        from database import get_user_assessments
+    def build(user_id: int, base_query: str) -> Tuple[str, str]:
+        """(conversation history, personalized prompt) from one history format and one DB read
         
-        # Get conversation history
-        memory = memory_manager.get_or_create_memory(user_id)
-        conversation_history = memory.get_context()
+        Equivalent to calling get_conversation_history and get_personalized_prompt.
+        """
+        from database import get_user_assessments
         
-        # Get latest assessment to understand user's state
+        conversation_history = memory_manager.get_or_create_memory(user_id).get_context()
         assessments = get_user_assessments(user_id, limit=1)
-        
+        prompt = ConversationContextBuilder._personalize(base_query, conversation_history, assessments)
+        return conversation_history, prompt
+    
+    @staticmethod
+    def get_personalized_prompt(user_id: int, base_query: str) -> str:
+        """Generate personalized prompt with user context and conversation history"""
+        return ConversationContextBuilder.build(user_id, base_query)[1]
+
+    @staticmethod
+    def is_personalized(base_query: str, prompt: str) -> bool:
+        """True if prompt carries user context (history or an assessment note) beyond base_query"""
+        return prompt != ConversationContextBuilder._personalize(base_query, "", [])
+
+    @staticmethod
+    def _personalize(base_query: str, conversation_history: str, assessments: List[Dict]) -> str:
+        """Prompt text for base_query given the formatted history and latest assessment"""
         context_notes = []
         
         if assessments:
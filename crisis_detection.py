@@ -6,6 +6,11 @@ Detects potential crisis situations through keyword analysis and sentiment detec
 import re
 from typing import Dict, List, Tuple
 
+try:
+    import ahocorasick  # optional: pyahocorasick
+except ImportError:
+    ahocorasick = None
+
 class CrisisDetector:
     """Detects crisis situations in user messages"""
     
@@ -40,6 +45,20 @@ class CrisisDetector:
         'crying', 'can\'t stop crying', 'can\'t sleep', 'nightmares'
     ]
     
+    # One alternation over every keyword, so a single scan clears the (common) message
+    # that contains none of them before the per-keyword checks run
+    _ANY_KEYWORD_RE = re.compile('|'.join(map(re.escape, CRISIS_KEYWORDS + WARNING_KEYWORDS)))
+    
+    # With pyahocorasick installed, one automaton pass finds every keyword occurrence
+    # (overlaps included, like the substring checks) and replaces both steps above
+    _AUTOMATON = None
+    if ahocorasick is not None:
+        _AUTOMATON = ahocorasick.Automaton()
+        for _keyword in CRISIS_KEYWORDS + WARNING_KEYWORDS:
+            _AUTOMATON.add_word(_keyword, _keyword)
+        _AUTOMATON.make_automaton()
+        del _keyword
+    
     @staticmethod
     def detect_crisis(message: str) -> Dict:
         """
@@ -57,13 +76,19 @@ class CrisisDetector:
         crisis_triggers = []
         warning_triggers = []
         
-        for keyword in CrisisDetector.CRISIS_KEYWORDS:
-            if keyword in message_lower:
-                crisis_triggers.append(keyword)
-        
-        for keyword in CrisisDetector.WARNING_KEYWORDS:
-            if keyword in message_lower:
-                warning_triggers.append(keyword)
+        if CrisisDetector._AUTOMATON is not None:
+            found = {keyword for _, keyword in CrisisDetector._AUTOMATON.iter(message_lower)}
+            if found:
+                crisis_triggers = [k for k in CrisisDetector.CRISIS_KEYWORDS if k in found]
+                warning_triggers = [k for k in CrisisDetector.WARNING_KEYWORDS if k in found]
+        elif CrisisDetector._ANY_KEYWORD_RE.search(message_lower):
+            for keyword in CrisisDetector.CRISIS_KEYWORDS:
+                if keyword in message_lower:
+                    crisis_triggers.append(keyword)
+            
+            for keyword in CrisisDetector.WARNING_KEYWORDS:
+                if keyword in message_lower:
+                    warning_triggers.append(keyword)
         
         # Determine crisis level
         if crisis_triggers:
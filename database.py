@@ -1,6 +1,14 @@
 import sqlite3
+from collections import OrderedDict
+from contextlib import contextmanager
 from datetime import datetime
+from queue import Queue, Empty
+import json
 import os
+import threading
+import time
+
+from error_handler import logger
 
 # Use data directory for Docker volume mounting
 DB_DIR = 'data'
@@ -17,11 +25,157 @@ def get_db_connection():
     return conn
 
 
+_conn_local = threading.local()
+
+
+@contextmanager
+def db_connection():
+    """
+    Yield this thread's reusable connection (row factory, 5s busy timeout) inside a
+    transaction: committed when the block exits cleanly, rolled back if it raises.
+    Saves reopening the file on every request, unlike get_db_connection().
+    """
+    conn = getattr(_conn_local, 'conn', None)
+    if conn is None:
+        conn = sqlite3.connect(DB_PATH, timeout=5)
+        conn.row_factory = sqlite3.Row
+        # WAL is persistent (set in init_db); these are per-connection
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        _conn_local.conn = conn
+    with conn:
+        yield conn
+
+
+_ping_local = threading.local()
+
+
+def db_ping():
+    """True if the database file answers a query; each thread reuses one connection"""
+    try:
+        conn = getattr(_ping_local, 'conn', None)
+        if conn is None:
+            # mode=rw: a missing file is an error rather than a new empty database
+            conn = _ping_local.conn = sqlite3.connect(f'file:{DB_PATH}?mode=rw', uri=True)
+        conn.execute('PRAGMA schema_version').fetchone()  # reads the file header
+        return True
+    except sqlite3.Error:
+        _ping_local.conn = None
+        return False
+
+
+# ========== Background writes ==========
+# Writes whose result the response doesn't need are run by a single writer
+# thread, so the request returns without waiting on SQLite's commit/fsync.
+# The writer drains the queue in batches (up to WRITE_BATCH_SIZE items or
+# WRITE_BATCH_WINDOW seconds): queued rows are inserted with executemany in a
+# single transaction, then queued callables run in submission order.
+
+WRITE_BATCH_SIZE = 100
+WRITE_BATCH_WINDOW = 0.1  # seconds
+
+_ROW = object()  # queue tag for a (sql, params) row write
+
+_write_queue = Queue()
+_writer_thread = None
+_writer_lock = threading.Lock()
+
+
+def _apply_writes(conn, batch):
+    rows = {}  # sql -> [params], grouped so each statement runs once via executemany
+    calls = []
+    for item in batch:
+        if item[0] is _ROW:
+            rows.setdefault(item[1], []).append(item[2])
+        else:
+            calls.append(item)
+    
+    if rows:
+        try:
+            with conn:  # one transaction (one commit) for the whole batch
+                for sql, params in rows.items():
+                    conn.executemany(sql, params)
+        except sqlite3.Error:
+            # Retry row by row so one bad row doesn't drop the rest of the batch
+            for sql, params in rows.items():
+                for row in params:
+                    try:
+                        with conn:
+                            conn.execute(sql, row)
+                    except sqlite3.Error:
+                        logger.error(f"Background row write failed, row dropped: {' '.join(sql.split()[:3])}",
+                                     exc_info=True)
+    
+    # Callables run after the rows commit, so e.g. cache invalidation sees the new data
+    for fn, args, kwargs in calls:
+        try:
+            fn(*args, **kwargs)
+        except Exception:
+            logger.error(f"Background write {getattr(fn, '__name__', fn)} failed", exc_info=True)
+
+
+def _run_writes():
+    conn = sqlite3.connect(DB_PATH)
+    # WAL (set in init_db) + NORMAL sync: commits don't fsync, checkpoints do
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute('PRAGMA temp_store=MEMORY')
+    while True:
+        batch = [_write_queue.get()]
+        
+        # Keep collecting until the window closes or the batch is full
+        deadline = time.monotonic() + WRITE_BATCH_WINDOW
+        while len(batch) < WRITE_BATCH_SIZE:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(_write_queue.get(timeout=remaining))
+            except Empty:
+                break
+        
+        try:
+            _apply_writes(conn, batch)
+        finally:
+            for _ in batch:
+                _write_queue.task_done()
+
+
+def _ensure_writer():
+    global _writer_thread
+    # Started lazily so each (forked) worker process gets its own live writer
+    if _writer_thread is None or not _writer_thread.is_alive():
+        with _writer_lock:
+            if _writer_thread is None or not _writer_thread.is_alive():
+                _writer_thread = threading.Thread(target=_run_writes, name='db-writer', daemon=True)
+                _writer_thread.start()
+
+
+def enqueue_write(fn, *args, **kwargs):
+    """Run fn(*args, **kwargs) on the background writer thread, in submission order"""
+    _ensure_writer()
+    _write_queue.put((fn, args, kwargs))
+
+
+def enqueue_row(sql, params):
+    """Queue a single-row INSERT/UPDATE for the writer's next batched transaction"""
+    _ensure_writer()
+    _write_queue.put((_ROW, sql, params))
+
+
+def flush_writes():
+    """Block until every queued write has been applied"""
+    _write_queue.join()
+
+
 def init_db():
     """Initialize the database with required tables"""
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
     
+    # WAL lets readers (e.g. the read-only analytics connections) run
+    # alongside a writer; the setting is persistent in the database file
+    cursor.execute('PRAGMA journal_mode=WAL')
+    
     # Users table with authentication fields (Phase 2)
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS users (
@@ -163,7 +317,283 @@ def init_db():
         cursor.execute('ALTER TABLE users ADD COLUMN display_name TEXT')
     if 'bio' not in columns:
         cursor.execute('ALTER TABLE users ADD COLUMN bio TEXT')
-    
+    if 'last_seen_at' not in columns:
+        cursor.execute('ALTER TABLE users ADD COLUMN last_seen_at TIMESTAMP')
+        cursor.execute('''
+            UPDATE users SET last_seen_at = (
+                SELECT MAX(created_at) FROM chat_history WHERE user_id = users.id
+            )
+        ''')
+
+    # Composite indexes for per-user lookups ordered by time (analytics)
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_chat_user_time
+        ON chat_history(user_id, created_at)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_assess_user_type_time
+        ON assessment_results(user_id, assessment_type, created_at DESC)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_crisis_user_time
+        ON crisis_events(user_id, created_at DESC)
+    ''')
+    # Dashboard: per-user counts, last-week activity and recent messages
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_conv_user_ts
+        ON conversations(user_id, timestamp)
+    ''')
+
+    # Integer epoch-second mirror of created_at for cheaper range scans.
+    # Virtual generated columns need no backfill and stay in step with
+    # created_at; only the indexes below store the integer values.
+    for table in ('chat_history', 'assessment_results', 'crisis_events'):
+        cursor.execute(f"PRAGMA table_xinfo({table})")
+        columns = [col[1] for col in cursor.fetchall()]
+        if 'created_at_i' not in columns:
+            cursor.execute(f'''
+                ALTER TABLE {table} ADD COLUMN created_at_i INTEGER
+                GENERATED ALWAYS AS (CAST(strftime('%s', created_at) AS INTEGER)) VIRTUAL
+            ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_chat_user_time_i
+        ON chat_history(user_id, created_at_i)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_assess_user_type_time_i
+        ON assessment_results(user_id, assessment_type, created_at_i)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_crisis_user_time_i
+        ON crisis_events(user_id, created_at_i)
+    ''')
+
+    # Latest chat per user, for counting recently active users
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_users_lastseen
+        ON users(last_seen_at) WHERE last_seen_at IS NOT NULL
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_users_lastseen_insert
+        AFTER INSERT ON chat_history WHEN NEW.user_id IS NOT NULL
+        BEGIN
+            UPDATE users
+            SET last_seen_at = COALESCE(MAX(last_seen_at, NEW.created_at), NEW.created_at)
+            WHERE id = NEW.user_id;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_users_lastseen_delete
+        AFTER DELETE ON chat_history WHEN OLD.user_id IS NOT NULL
+        BEGIN
+            UPDATE users
+            SET last_seen_at = (SELECT MAX(created_at) FROM chat_history
+                                WHERE user_id = OLD.user_id)
+            WHERE id = OLD.user_id;
+        END
+    ''')
+
+    # Per-user analytics roll-up, kept current by the triggers below
+    cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'analytics_user_summary'"
+    )
+    summary_exists = cursor.fetchone() is not None
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS analytics_user_summary (
+            user_id INTEGER PRIMARY KEY,
+            total_conversations INTEGER NOT NULL DEFAULT 0,
+            total_assessments INTEGER NOT NULL DEFAULT 0,
+            crisis_events INTEGER NOT NULL DEFAULT 0,
+            last_phq9_score INTEGER,
+            last_phq9_at TIMESTAMP,
+            last_gad7_score INTEGER,
+            last_gad7_at TIMESTAMP,
+            first_interaction TIMESTAMP,
+            last_interaction TIMESTAMP,
+            total_message_chars INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute("PRAGMA table_info(analytics_user_summary)")
+    columns = [col[1] for col in cursor.fetchall()]
+    if 'total_message_chars' not in columns:
+        cursor.execute('''
+            ALTER TABLE analytics_user_summary
+            ADD COLUMN total_message_chars INTEGER NOT NULL DEFAULT 0
+        ''')
+        cursor.execute('''
+            UPDATE analytics_user_summary SET total_message_chars = COALESCE(
+                (SELECT SUM(LENGTH(message)) FROM chat_history
+                 WHERE chat_history.user_id = analytics_user_summary.user_id), 0)
+        ''')
+        # Recreated below with the new column
+        cursor.execute('DROP TRIGGER IF EXISTS trg_summary_chat_insert')
+        cursor.execute('DROP TRIGGER IF EXISTS trg_summary_chat_delete')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_summary_chat_insert
+        AFTER INSERT ON chat_history WHEN NEW.user_id IS NOT NULL
+        BEGIN
+            INSERT INTO analytics_user_summary
+                (user_id, total_conversations, first_interaction, last_interaction,
+                 total_message_chars)
+            VALUES (NEW.user_id, 1, NEW.created_at, NEW.created_at, LENGTH(NEW.message))
+            ON CONFLICT(user_id) DO UPDATE SET
+                total_conversations = total_conversations + 1,
+                total_message_chars = total_message_chars + excluded.total_message_chars,
+                first_interaction = COALESCE(MIN(first_interaction, excluded.first_interaction),
+                                             excluded.first_interaction),
+                last_interaction = COALESCE(MAX(last_interaction, excluded.last_interaction),
+                                            excluded.last_interaction);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_summary_chat_delete
+        AFTER DELETE ON chat_history WHEN OLD.user_id IS NOT NULL
+        BEGIN
+            UPDATE analytics_user_summary SET
+                total_conversations = total_conversations - 1,
+                total_message_chars = total_message_chars - LENGTH(OLD.message),
+                first_interaction = (SELECT MIN(created_at) FROM chat_history
+                                     WHERE user_id = OLD.user_id),
+                last_interaction = (SELECT MAX(created_at) FROM chat_history
+                                    WHERE user_id = OLD.user_id)
+            WHERE user_id = OLD.user_id;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_summary_assessment_insert
+        AFTER INSERT ON assessment_results WHEN NEW.user_id IS NOT NULL
+        BEGIN
+            INSERT INTO analytics_user_summary (user_id, total_assessments)
+            VALUES (NEW.user_id, 0)
+            ON CONFLICT(user_id) DO NOTHING;
+            UPDATE analytics_user_summary SET
+                total_assessments = total_assessments + 1,
+                last_phq9_score = CASE
+                    WHEN NEW.assessment_type = 'phq9'
+                         AND (last_phq9_at IS NULL OR NEW.created_at >= last_phq9_at)
+                    THEN NEW.score ELSE last_phq9_score END,
+                last_phq9_at = CASE
+                    WHEN NEW.assessment_type = 'phq9'
+                         AND (last_phq9_at IS NULL OR NEW.created_at >= last_phq9_at)
+                    THEN NEW.created_at ELSE last_phq9_at END,
+                last_gad7_score = CASE
+                    WHEN NEW.assessment_type = 'gad7'
+                         AND (last_gad7_at IS NULL OR NEW.created_at >= last_gad7_at)
+                    THEN NEW.score ELSE last_gad7_score END,
+                last_gad7_at = CASE
+                    WHEN NEW.assessment_type = 'gad7'
+                         AND (last_gad7_at IS NULL OR NEW.created_at >= last_gad7_at)
+                    THEN NEW.created_at ELSE last_gad7_at END
+            WHERE user_id = NEW.user_id;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_summary_assessment_delete
+        AFTER DELETE ON assessment_results WHEN OLD.user_id IS NOT NULL
+        BEGIN
+            UPDATE analytics_user_summary SET
+                total_assessments = total_assessments - 1,
+                (last_phq9_score, last_phq9_at) = (
+                    SELECT score, created_at FROM assessment_results
+                    WHERE user_id = OLD.user_id AND assessment_type = 'phq9'
+                    ORDER BY created_at DESC LIMIT 1),
+                (last_gad7_score, last_gad7_at) = (
+                    SELECT score, created_at FROM assessment_results
+                    WHERE user_id = OLD.user_id AND assessment_type = 'gad7'
+                    ORDER BY created_at DESC LIMIT 1)
+            WHERE user_id = OLD.user_id;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_summary_crisis_insert
+        AFTER INSERT ON crisis_events WHEN NEW.user_id IS NOT NULL
+        BEGIN
+            INSERT INTO analytics_user_summary (user_id, crisis_events)
+            VALUES (NEW.user_id, 1)
+            ON CONFLICT(user_id) DO UPDATE SET crisis_events = crisis_events + 1;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_summary_crisis_delete
+        AFTER DELETE ON crisis_events WHEN OLD.user_id IS NOT NULL
+        BEGIN
+            UPDATE analytics_user_summary SET crisis_events = crisis_events - 1
+            WHERE user_id = OLD.user_id;
+        END
+    ''')
+    if not summary_exists:
+        # Backfill from existing rows the first time the roll-up is created
+        cursor.execute('''
+            INSERT INTO analytics_user_summary
+            SELECT ids.user_id,
+                (SELECT COUNT(*) FROM chat_history WHERE user_id = ids.user_id),
+                (SELECT COUNT(*) FROM assessment_results WHERE user_id = ids.user_id),
+                (SELECT COUNT(*) FROM crisis_events WHERE user_id = ids.user_id),
+                p.score, p.created_at, g.score, g.created_at,
+                (SELECT MIN(created_at) FROM chat_history WHERE user_id = ids.user_id),
+                (SELECT MAX(created_at) FROM chat_history WHERE user_id = ids.user_id),
+                (SELECT COALESCE(SUM(LENGTH(message)), 0) FROM chat_history
+                 WHERE user_id = ids.user_id)
+            FROM (
+                SELECT user_id FROM chat_history
+                UNION SELECT user_id FROM assessment_results
+                UNION SELECT user_id FROM crisis_events
+            ) ids
+            LEFT JOIN (
+                SELECT user_id, score, MAX(created_at) AS created_at
+                FROM assessment_results WHERE assessment_type = 'phq9'
+                GROUP BY user_id
+            ) p ON p.user_id = ids.user_id
+            LEFT JOIN (
+                SELECT user_id, score, MAX(created_at) AS created_at
+                FROM assessment_results WHERE assessment_type = 'gad7'
+                GROUP BY user_id
+            ) g ON g.user_id = ids.user_id
+            WHERE ids.user_id IS NOT NULL
+        ''')
+
+    # Single-row system-wide row counts, kept current by triggers
+    cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'analytics_counters'"
+    )
+    counters_exist = cursor.fetchone() is not None
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS analytics_counters (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            total_users INTEGER NOT NULL DEFAULT 0,
+            total_conversations INTEGER NOT NULL DEFAULT 0,
+            total_assessments INTEGER NOT NULL DEFAULT 0,
+            total_crises INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    for table, column in (('users', 'total_users'),
+                          ('chat_history', 'total_conversations'),
+                          ('assessment_results', 'total_assessments'),
+                          ('crisis_events', 'total_crises')):
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_counters_{table}_insert
+            AFTER INSERT ON {table}
+            BEGIN
+                UPDATE analytics_counters SET {column} = {column} + 1 WHERE id = 1;
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_counters_{table}_delete
+            AFTER DELETE ON {table}
+            BEGIN
+                UPDATE analytics_counters SET {column} = {column} - 1 WHERE id = 1;
+            END
+        ''')
+    if not counters_exist:
+        cursor.execute('''
+            INSERT INTO analytics_counters
+            VALUES (1,
+                    (SELECT COUNT(*) FROM users),
+                    (SELECT COUNT(*) FROM chat_history),
+                    (SELECT COUNT(*) FROM assessment_results),
+                    (SELECT COUNT(*) FROM crisis_events))
+        ''')
+
     conn.commit()
     conn.close()
     print("✓ Database initialized successfully")
@@ -226,32 +656,73 @@ def get_user_assessments(user_id, assessment_type=None, limit=10):
     ]
 
 
+_INSERT_CHAT_MESSAGE = '''
+    INSERT INTO chat_history (user_id, message, response, chat_session_id)
+    VALUES (?, ?, ?, ?)
+'''
+_TOUCH_CHAT_SESSION = '''
+    UPDATE chat_sessions SET updated_at = CURRENT_TIMESTAMP WHERE id = ?
+'''
+
+
 def save_chat_message(user_id, message, response, chat_session_id=None):
     """Save chat message to database"""
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
     
-    cursor.execute('''
-        INSERT INTO chat_history (user_id, message, response, chat_session_id)
-        VALUES (?, ?, ?, ?)
-    ''', (user_id, message, response, chat_session_id))
+    cursor.execute(_INSERT_CHAT_MESSAGE, (user_id, message, response, chat_session_id))
     
     # Update session's updated_at
     if chat_session_id:
-        cursor.execute('''
-            UPDATE chat_sessions SET updated_at = CURRENT_TIMESTAMP WHERE id = ?
-        ''', (chat_session_id,))
+        cursor.execute(_TOUCH_CHAT_SESSION, (chat_session_id,))
     
     conn.commit()
     conn.close()
 
 
+def queue_chat_message(user_id, message, response, chat_session_id=None):
+    """Save chat message via the batched background writer"""
+    enqueue_row(_INSERT_CHAT_MESSAGE, (user_id, message, response, chat_session_id))
+    if chat_session_id:
+        enqueue_row(_TOUCH_CHAT_SESSION, (chat_session_id,))
+
+
+# Per-session message lists, keyed (user_id, chat_session_id) -> (version, messages).
+# The version is the row count and highest id of the session's rows in both tables,
+# so it changes with any write (from any worker process) and one cheap aggregate
+# query decides whether the cached list is still current.
+SESSION_HISTORY_CACHE_SIZE = 256
+_session_history_cache = OrderedDict()
+_session_history_lock = threading.Lock()
+
+_SESSION_HISTORY_VERSION = '''
+    SELECT (SELECT COUNT(*) FROM conversations WHERE user_id = ? AND chat_session_id = ?),
+           (SELECT MAX(id) FROM conversations WHERE user_id = ? AND chat_session_id = ?),
+           (SELECT COUNT(*) FROM chat_history WHERE user_id = ? AND chat_session_id = ?),
+           (SELECT MAX(id) FROM chat_history WHERE user_id = ? AND chat_session_id = ?)
+'''
+
+
 def get_chat_history(user_id, limit=50, chat_session_id=None):
-    """Get chat history for a user, optionally filtered by session"""
+    """Get chat history for a user, optionally filtered by session
+    
+    Session histories are memoized (see _session_history_cache); the returned list
+    may be shared, so callers must not modify it.
+    """
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
     
     if chat_session_id:
+        key = (user_id, chat_session_id)
+        cursor.execute(_SESSION_HISTORY_VERSION, key * 4)
+        version = cursor.fetchone()
+        with _session_history_lock:
+            cached = _session_history_cache.get(key)
+            if cached is not None and cached[0] == version:
+                _session_history_cache.move_to_end(key)
+                conn.close()
+                return cached[1]
+        
         # Try conversations table first (new system)
         cursor.execute('''
             SELECT message, response, timestamp
@@ -294,7 +765,7 @@ def get_chat_history(user_id, limit=50, chat_session_id=None):
     
     conn.close()
     
-    return [
+    messages = [
         {
             'message': r[0],
             'response': r[1],
@@ -302,6 +773,15 @@ def get_chat_history(user_id, limit=50, chat_session_id=None):
         }
         for r in results
     ]
+    
+    if chat_session_id:
+        with _session_history_lock:
+            _session_history_cache[key] = (version, messages)
+            _session_history_cache.move_to_end(key)
+            while len(_session_history_cache) > SESSION_HISTORY_CACHE_SIZE:
+                _session_history_cache.popitem(last=False)
+    
+    return messages
 
 
 # ==================== CHAT SESSION FUNCTIONS ====================
@@ -431,6 +911,12 @@ def create_guest_user():
     return user_id
 
 
+_INSERT_CRISIS_EVENT = '''
+    INSERT INTO crisis_events (user_id, message, crisis_level, severity, triggers)
+    VALUES (?, ?, ?, ?, ?)
+'''
+
+
 def save_crisis_event(user_id, message, crisis_level, severity, triggers):
     """Save crisis event to database for tracking and monitoring"""
     conn = sqlite3.connect(DB_PATH)
@@ -438,10 +924,7 @@ def save_crisis_event(user_id, message, crisis_level, severity, triggers):
     
     triggers_str = ','.join(triggers) if triggers else ''
     
-    cursor.execute('''
-        INSERT INTO crisis_events (user_id, message, crisis_level, severity, triggers)
-        VALUES (?, ?, ?, ?, ?)
-    ''', (user_id, message, crisis_level, severity, triggers_str))
+    cursor.execute(_INSERT_CRISIS_EVENT, (user_id, message, crisis_level, severity, triggers_str))
     
     conn.commit()
     event_id = cursor.lastrowid
@@ -450,6 +933,12 @@ def save_crisis_event(user_id, message, crisis_level, severity, triggers):
     return event_id
 
 
+def queue_crisis_event(user_id, message, crisis_level, severity, triggers):
+    """Save crisis event via the batched background writer"""
+    triggers_str = ','.join(triggers) if triggers else ''
+    enqueue_row(_INSERT_CRISIS_EVENT, (user_id, message, crisis_level, severity, triggers_str))
+
+
 def get_crisis_events(user_id, limit=10):
     """Get crisis event history for a user"""
     conn = sqlite3.connect(DB_PATH)
@@ -530,6 +1019,18 @@ def get_user_by_id(user_id):
     return None
 
 
+def get_user_email(user_id):
+    """Get just a user's email address (None if the user doesn't exist)"""
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    
+    cursor.execute('SELECT email FROM users WHERE id = ? LIMIT 1', (user_id,))
+    row = cursor.fetchone()
+    conn.close()
+    
+    return row[0] if row else None
+
+
 def create_user(username, email, password):
     """Create a new user with authentication - password stored in plain text"""
     conn = sqlite3.connect(DB_PATH)
@@ -637,6 +1138,7 @@ def delete_user(user_id):
     cursor.execute('DELETE FROM sentiment_history WHERE user_id = ?', (user_id,))
     cursor.execute('DELETE FROM user_preferences WHERE user_id = ?', (user_id,))
     cursor.execute('DELETE FROM chat_sessions WHERE user_id = ?', (user_id,))
+    cursor.execute('DELETE FROM analytics_user_summary WHERE user_id = ?', (user_id,))
     cursor.execute('DELETE FROM users WHERE id = ?', (user_id,))
     
     conn.commit()
@@ -645,18 +1147,21 @@ def delete_user(user_id):
 
 # ========== PHASE 2: Sentiment Functions ==========
 
+_INSERT_SENTIMENT = '''
+    INSERT INTO sentiment_history (user_id, message, sentiment_score, sentiment_label, emotions, mood_score)
+    VALUES (?, ?, ?, ?, ?, ?)
+'''
+
+
 def save_sentiment(user_id, message, sentiment_score, sentiment_label, emotions, mood_score):
     """Save sentiment analysis result"""
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
     
-    import json
     emotions_str = json.dumps(emotions) if emotions else '{}'
     
-    cursor.execute('''
-        INSERT INTO sentiment_history (user_id, message, sentiment_score, sentiment_label, emotions, mood_score)
-        VALUES (?, ?, ?, ?, ?, ?)
-    ''', (user_id, message, sentiment_score, sentiment_label, emotions_str, mood_score))
+    cursor.execute(_INSERT_SENTIMENT,
+                   (user_id, message, sentiment_score, sentiment_label, emotions_str, mood_score))
     
     conn.commit()
     result_id = cursor.lastrowid
@@ -665,6 +1170,13 @@ def save_sentiment(user_id, message, sentiment_score, sentiment_label, emotions,
     return result_id
 
 
+def queue_sentiment(user_id, message, sentiment_score, sentiment_label, emotions, mood_score):
+    """Save sentiment analysis result via the batched background writer"""
+    emotions_str = json.dumps(emotions) if emotions else '{}'
+    enqueue_row(_INSERT_SENTIMENT,
+                (user_id, message, sentiment_score, sentiment_label, emotions_str, mood_score))
+
+
 def get_sentiment_history(user_id, limit=50):
     """Get sentiment history for a user"""
     conn = sqlite3.connect(DB_PATH)
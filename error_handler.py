@@ -6,12 +6,15 @@ Implements comprehensive error handling, logging, and monitoring
 import logging
 import traceback
 import sys
+import time
 from datetime import datetime
 from functools import wraps
 from typing import Callable, Any, Optional
 from logging.handlers import RotatingFileHandler
 import os
 
+import orjson
+
 
 # Create logs directory if it doesn't exist
 LOG_DIR = 'logs'
@@ -19,15 +22,35 @@ if not os.path.exists(LOG_DIR):
     os.makedirs(LOG_DIR)
 
 
+class OrjsonFormatter(logging.Formatter):
+    """Formats each record as one JSON object per line (LOG_FORMAT=json)"""
+    
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': record.created,
+            'lvl': record.levelname,
+            'name': record.name,
+            'func': record.funcName,
+            'line': record.lineno,
+            'msg': record.getMessage()
+        }
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return orjson.dumps(entry).decode()
+
+
 # Configure logging
 def setup_logging():
     """Setup application logging with rotation"""
     
     # Create formatter
-    formatter = logging.Formatter(
-        '%(asctime)s | %(levelname)-8s | %(name)s | %(funcName)s:%(lineno)d | %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
+    if os.getenv('LOG_FORMAT', 'text').lower() == 'json':
+        formatter = OrjsonFormatter()
+    else:
+        formatter = logging.Formatter(
+            '%(asctime)s | %(levelname)-8s | %(name)s | %(funcName)s:%(lineno)d | %(message)s',
+            datefmt='%Y-%m-%d %H:%M:%S'
+        )
     
     # Console handler
     console_handler = logging.StreamHandler(sys.stdout)
@@ -165,16 +188,16 @@ def log_performance(func_name: str = None):
         
         @wraps(func)
         def wrapper(*args, **kwargs) -> Any:
-            start_time = datetime.now()
+            start_time = time.perf_counter()
             
             try:
                 result = func(*args, **kwargs)
-                duration = (datetime.now() - start_time).total_seconds()
+                duration = time.perf_counter() - start_time
                 logger.info(f"✓ {name} completed in {duration:.3f}s")
                 return result
             
             except Exception as e:
-                duration = (datetime.now() - start_time).total_seconds()
+                duration = time.perf_counter() - start_time
                 logger.error(f"✗ {name} failed after {duration:.3f}s: {str(e)}")
                 raise
         
@@ -276,8 +299,6 @@ def retry_on_failure(max_retries: int = 3, delay: float = 1.0):
     def decorator(func: Callable) -> Callable:
         @wraps(func)
         def wrapper(*args, **kwargs) -> Any:
-            import time
-            
             last_exception = None
             
             for attempt in range(max_retries):
@@ -0,0 +1,38 @@
+"""
+Gunicorn configuration for MindSpace
+Threaded workers suit /ask, which spends most of its time waiting on LLM APIs.
+
+    gunicorn -c gunicorn.conf.py app:app
+"""
+
+import os
+import threading
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('GUNICORN_WORKERS', '2'))
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', '32'))
+
+# LLM calls (with hedging) and SSE streams can legitimately run for a while
+timeout = 120
+graceful_timeout = 30
+keepalive = 5
+
+# Import the app once in the master and fork workers from it. app.py defers the
+# embedder, Chroma and LLM clients, so no threads or model state exist at fork time
+preload_app = True
+
+accesslog = '-'
+errorlog = '-'
+
+
+def when_ready(server):
+    server.log.info("Phase 2 features enabled: Authentication, Sentiment Analysis, Notifications, API Docs")
+    server.log.info(f"API Documentation available at: http://{bind}/api/docs/")
+
+
+def post_fork(server, worker):
+    """Build the worker's QA chain pool and SMTP connections in the background so first use doesn't pay for them"""
+    from app import get_qa_chain, smtp_pool
+    threading.Thread(target=get_qa_chain, name='qa-chain-warmup', daemon=True).start()
+    threading.Thread(target=smtp_pool.warm, name='smtp-warmup', daemon=True).start()
@@ -5,6 +5,10 @@ Implements email notifications for various events
 
 import smtplib
 import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime
@@ -33,6 +37,120 @@ class EmailConfig:
         return bool(cls.SMTP_USERNAME and cls.SMTP_PASSWORD)
 
 
+# ========== SMTP Connection Pool ==========
+
+class SMTPConnectionPool:
+    """
+    Fixed-size pool of logged-in SMTP connections, so sends don't pay for
+    TCP + STARTTLS + AUTH every time. Slots are connected lazily (or by warm())
+    and a keepalive thread NOOPs idle connections so the server doesn't drop them.
+    """
+
+    KEEPALIVE_INTERVAL = 30  # seconds
+
+    def __init__(self, size: int = 4):
+        self.size = size
+        self._slots = queue.LifoQueue(maxsize=size)
+        for _ in range(size):
+            self._slots.put(None)
+        self._keepalive_thread = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _connect() -> smtplib.SMTP:
+        if EmailConfig.SMTP_PORT == 465:
+            server = smtplib.SMTP_SSL(EmailConfig.SMTP_SERVER, EmailConfig.SMTP_PORT, timeout=30)
+        else:
+            server = smtplib.SMTP(EmailConfig.SMTP_SERVER, EmailConfig.SMTP_PORT, timeout=30)
+            server.starttls()
+        server.login(EmailConfig.SMTP_USERNAME, EmailConfig.SMTP_PASSWORD)
+        return server
+
+    @staticmethod
+    def _close(server: Optional[smtplib.SMTP]):
+        if server is None:
+            return
+        try:
+            server.quit()
+        except (smtplib.SMTPException, OSError):
+            server.close()
+
+    def _ensure_keepalive(self):
+        with self._lock:
+            if self._keepalive_thread is None or not self._keepalive_thread.is_alive():
+                self._keepalive_thread = threading.Thread(
+                    target=self._keepalive_loop, name='smtp-keepalive', daemon=True
+                )
+                self._keepalive_thread.start()
+
+    def _keepalive_loop(self):
+        while True:
+            time.sleep(self.KEEPALIVE_INTERVAL)
+            # Only touch connections that are idle right now; busy ones are in use anyway
+            idle = []
+            try:
+                while len(idle) < self.size:
+                    idle.append(self._slots.get_nowait())
+            except queue.Empty:
+                pass
+            for server in idle:
+                if server is not None:
+                    try:
+                        server.noop()
+                    except (smtplib.SMTPException, OSError):
+                        self._close(server)
+                        server = None
+                self._slots.put(server)
+
+    def warm(self):
+        """Connect every idle slot up front (call after forking, never at import)"""
+        if not EmailConfig.is_configured():
+            return
+        idle = []
+        try:
+            while len(idle) < self.size:
+                idle.append(self._slots.get_nowait())
+        except queue.Empty:
+            pass
+        try:
+            for i, server in enumerate(idle):
+                if server is None:
+                    idle[i] = self._connect()
+        except (smtplib.SMTPException, OSError) as e:
+            logger.warning(f"SMTP pool warm-up failed: {e}")
+        finally:
+            for server in idle:
+                self._slots.put(server)
+        self._ensure_keepalive()
+
+    def send(self, msg) -> None:
+        """Send an email.message.Message on a pooled connection, reconnecting if it was dropped"""
+        server = self._slots.get()
+        try:
+            if server is None:
+                server = self._connect()
+                self._ensure_keepalive()
+            try:
+                server.send_message(msg)
+            except smtplib.SMTPServerDisconnected:
+                self._close(server)
+                server = self._connect()
+                server.send_message(msg)
+        except Exception:
+            self._close(server)
+            server = None
+            raise
+        finally:
+            self._slots.put(server)
+
+
+smtp_pool = SMTPConnectionPool(int(os.getenv('SMTP_POOL_SIZE', '4')))
+
+# Sends requested from a web request run here so the worker thread isn't held for the
+# SMTP round trip; one sender per pooled connection
+_send_executor = ThreadPoolExecutor(max_workers=smtp_pool.size, thread_name_prefix='email-sender')
+
+
 # ========== Email Templates ==========
 
 TEMPLATES = {
@@ -374,11 +492,7 @@ class EmailService:
             # Add HTML version
             msg.attach(MIMEText(html_content, 'html'))
             
-            # Connect and send
-            with smtplib.SMTP(EmailConfig.SMTP_SERVER, EmailConfig.SMTP_PORT) as server:
-                server.starttls()
-                server.login(EmailConfig.SMTP_USERNAME, EmailConfig.SMTP_PASSWORD)
-                server.sendmail(EmailConfig.FROM_EMAIL, to_email, msg.as_string())
+            smtp_pool.send(msg)
             
             logger.info(f"Email sent successfully to {to_email}: {subject}")
             return True
@@ -387,6 +501,12 @@ class EmailService:
             logger.error(f"Failed to send email to {to_email}: {str(e)}")
             return False
     
+    @staticmethod
+    def send_email_in_background(to_email: str, subject: str, html_content: str,
+                                 text_content: str = None) -> Future:
+        """Send email off the request thread; the Future resolves to send_email's result"""
+        return _send_executor.submit(EmailService.send_email, to_email, subject, html_content, text_content)
+    
     @staticmethod
     def render_template(template_name: str, **kwargs) -> str:
         """Render email template with variables"""
@@ -533,6 +653,32 @@ def queue_notification(notification_type: str, user_id: int, data: Dict) -> bool
     return True
 
 
+def _send_queued_notification(notification) -> bool:
+    """Send one notification_queue row, returns True on success"""
+    import json
+    _, notif_type, _, data_json = notification
+    data = json.loads(data_json)
+    
+    # Process based on type
+    if notif_type == 'welcome':
+        return EmailService.send_welcome_email(
+            data['email'], data['username'], data.get('first_name')
+        )
+    elif notif_type == 'verification':
+        return EmailService.send_verification_email(
+            data['email'], data['username'], data['token']
+        )
+    elif notif_type == 'password_reset':
+        return EmailService.send_password_reset_email(
+            data['email'], data['username'], data['token']
+        )
+    elif notif_type == 'crisis_alert':
+        return EmailService.send_crisis_alert(
+            data['email'], data['crisis_level'], data.get('triggers', [])
+        )
+    return False
+
+
 def process_notification_queue() -> int:
     """Process pending notifications, returns count processed"""
     conn = sqlite3.connect(DB_PATH)
@@ -547,50 +693,33 @@ def process_notification_queue() -> int:
     ''')
     
     notifications = cursor.fetchall()
-    processed = 0
+    if not notifications:
+        conn.close()
+        return 0
     
-    import json
-    for notif_id, notif_type, user_id, data_json in notifications:
-        data = json.loads(data_json)
-        success = False
-        
-        # Process based on type
-        if notif_type == 'welcome':
-            success = EmailService.send_welcome_email(
-                data['email'], data['username'], data.get('first_name')
-            )
-        elif notif_type == 'verification':
-            success = EmailService.send_verification_email(
-                data['email'], data['username'], data['token']
-            )
-        elif notif_type == 'password_reset':
-            success = EmailService.send_password_reset_email(
-                data['email'], data['username'], data['token']
-            )
-        elif notif_type == 'crisis_alert':
-            success = EmailService.send_crisis_alert(
-                data['email'], data['crisis_level'], data.get('triggers', [])
-            )
-        
-        # Update status
-        if success:
-            cursor.execute('''
-                UPDATE notification_queue
-                SET status = 'sent', processed_at = CURRENT_TIMESTAMP
-                WHERE id = ?
-            ''', (notif_id,))
-            processed += 1
-        else:
-            cursor.execute('''
-                UPDATE notification_queue
-                SET attempts = attempts + 1
-                WHERE id = ?
-            ''', (notif_id,))
+    # Fan the batch out over the SMTP pool, one sender per pooled connection
+    with ThreadPoolExecutor(max_workers=min(smtp_pool.size, len(notifications))) as executor:
+        results = list(executor.map(_send_queued_notification, notifications))
+    
+    sent = [(n[0],) for n, ok in zip(notifications, results) if ok]
+    failed = [(n[0],) for n, ok in zip(notifications, results) if not ok]
+    
+    # Update status
+    cursor.executemany('''
+        UPDATE notification_queue
+        SET status = 'sent', processed_at = CURRENT_TIMESTAMP
+        WHERE id = ?
+    ''', sent)
+    cursor.executemany('''
+        UPDATE notification_queue
+        SET attempts = attempts + 1
+        WHERE id = ?
+    ''', failed)
     
     conn.commit()
     conn.close()
     
-    return processed
+    return len(sent)
 
 
 # ========== Wellness Tips ==========
@@ -4,6 +4,7 @@ Implements ML-based risk prediction, mood forecasting, and pattern detection
 """
 
 import sqlite3
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional, Tuple
 from collections import Counter
@@ -680,6 +681,11 @@ class PatternDetector:
 
 # ========== API Functions ==========
 
+# Runs the independent analyses of get_comprehensive_analysis side by side; each opens
+# its own SQLite connection, and sqlite3 releases the GIL while a query executes
+_analysis_executor = ThreadPoolExecutor(max_workers=3, thread_name_prefix='predictive')
+
+
 def get_risk_prediction(user_id: int, days: int = 14) -> Dict[str, Any]:
     """Get risk prediction for a user"""
     predictor = MentalHealthRiskPredictor(user_id)
@@ -700,9 +706,12 @@ def get_user_patterns(user_id: int, days: int = 30) -> Dict[str, Any]:
 
 def get_comprehensive_analysis(user_id: int) -> Dict[str, Any]:
     """Get comprehensive predictive analysis"""
+    risk = _analysis_executor.submit(get_risk_prediction, user_id)
+    forecast = _analysis_executor.submit(get_mood_forecast, user_id)
+    patterns = _analysis_executor.submit(get_user_patterns, user_id)
     return {
-        'risk': get_risk_prediction(user_id),
-        'forecast': get_mood_forecast(user_id),
-        'patterns': get_user_patterns(user_id),
+        'risk': risk.result(),
+        'forecast': forecast.result(),
+        'patterns': patterns.result(),
         'generated_at': datetime.now().isoformat()
     }
@@ -80,6 +80,35 @@ INTENSIFIERS = {
 # Negation words
 NEGATIONS = {'not', "n't", 'no', 'never', 'nothing', 'nowhere', 'neither', 'nobody', 'none', 'hardly', 'barely', 'scarcely'}
 
+# Mental health indicator phrases and words
+DEPRESSION_PHRASES = (
+    'feel empty', 'feel numb', 'no energy', 'cant sleep', "can't sleep",
+    'sleep too much', 'no appetite', 'eating too much', 'feel worthless',
+    'feel guilty', 'cant concentrate', "can't concentrate", 'no interest',
+    'dont care', "don't care", 'whats the point', "what's the point",
+    'feel alone', 'no one cares', 'feel hopeless', 'feel helpless'
+)
+DEPRESSION_WORDS = frozenset({'depressed', 'depression', 'hopeless', 'worthless', 'empty', 'numb'})
+
+ANXIETY_PHRASES = (
+    'cant stop worrying', "can't stop worrying", 'feel anxious',
+    'panic attack', 'heart racing', 'cant breathe', "can't breathe",
+    'feel nervous', 'on edge', 'restless', 'fear of', 'worried about'
+)
+ANXIETY_WORDS = frozenset({'anxious', 'anxiety', 'worried', 'panic', 'nervous', 'stressed'})
+
+# Crisis indicators (already handled by crisis_detection.py but included here)
+CRISIS_TERMS = ('suicide', 'suicidal', 'kill myself', 'end my life', 'self-harm', 'hurt myself')
+
+POSITIVE_PHRASES = (
+    'feeling better', 'getting better', 'making progress', 'feeling good',
+    'feeling happy', 'feeling hopeful', 'things are improving', 'im okay', "i'm okay"
+)
+POSITIVE_INDICATOR_WORDS = frozenset({'better', 'improving', 'hopeful', 'progress', 'happy', 'good'})
+
+# Punctuation stripped before tokenizing (apostrophes kept for contractions)
+_PUNCTUATION_RE = re.compile(r"[^\w\s']")
+
 
 # ========== Sentiment Analysis Class ==========
 
@@ -99,14 +128,14 @@ class SentimentAnalyzer:
         text = text.lower()
         
         # Remove punctuation but keep apostrophes for contractions
-        text = re.sub(r"[^\w\s']", ' ', text)
+        text = _PUNCTUATION_RE.sub(' ', text)
         
         # Tokenize
         words = text.split()
         
         return words
     
-    def analyze_sentiment(self, text: str) -> Dict:
+    def analyze_sentiment(self, text: str, words: Optional[List[str]] = None) -> Dict:
         """
         Analyze sentiment of text
         Returns: {
@@ -117,7 +146,8 @@ class SentimentAnalyzer:
             'negative_words': list
         }
         """
-        words = self.preprocess_text(text)
+        if words is None:
+            words = self.preprocess_text(text)
         
         positive_found = []
         negative_found = []
@@ -194,7 +224,7 @@ class SentimentAnalyzer:
             'sentiment_word_count': total_sentiment_words
         }
     
-    def analyze_emotions(self, text: str) -> Dict:
+    def analyze_emotions(self, text: str, words: Optional[List[str]] = None) -> Dict:
         """
         Analyze emotions in text
         Returns: {
@@ -203,7 +233,8 @@ class SentimentAnalyzer:
             'emotion_words': {emotion: [words]}
         }
         """
-        words = self.preprocess_text(text)
+        if words is None:
+            words = self.preprocess_text(text)
         word_set = set(words)
         
         emotion_scores = {}
@@ -228,13 +259,14 @@ class SentimentAnalyzer:
             'emotion_words': emotion_words
         }
     
-    def get_mental_health_indicators(self, text: str) -> Dict:
+    def get_mental_health_indicators(self, text: str, words: Optional[List[str]] = None) -> Dict:
         """
         Analyze text for mental health indicators
         Returns indicators relevant to depression, anxiety, etc.
         """
         text_lower = text.lower()
-        words = self.preprocess_text(text)
+        if words is None:
+            words = self.preprocess_text(text)
         
         indicators = {
             'depression_indicators': [],
@@ -244,56 +276,30 @@ class SentimentAnalyzer:
             'risk_level': 'low'
         }
         
-        # Depression indicators
-        depression_phrases = [
-            'feel empty', 'feel numb', 'no energy', 'cant sleep', "can't sleep",
-            'sleep too much', 'no appetite', 'eating too much', 'feel worthless',
-            'feel guilty', 'cant concentrate', "can't concentrate", 'no interest',
-            'dont care', "don't care", 'whats the point', "what's the point",
-            'feel alone', 'no one cares', 'feel hopeless', 'feel helpless'
-        ]
+        word_set = set(words)
         
-        for phrase in depression_phrases:
+        # Depression indicators
+        for phrase in DEPRESSION_PHRASES:
             if phrase in text_lower:
                 indicators['depression_indicators'].append(phrase)
-        
-        # Depression words
-        depression_words = {'depressed', 'depression', 'hopeless', 'worthless', 'empty', 'numb'}
-        indicators['depression_indicators'].extend(list(set(words) & depression_words))
+        indicators['depression_indicators'].extend(word_set & DEPRESSION_WORDS)
         
         # Anxiety indicators
-        anxiety_phrases = [
-            'cant stop worrying', "can't stop worrying", 'feel anxious',
-            'panic attack', 'heart racing', 'cant breathe', "can't breathe",
-            'feel nervous', 'on edge', 'restless', 'fear of', 'worried about'
-        ]
-        
-        for phrase in anxiety_phrases:
+        for phrase in ANXIETY_PHRASES:
             if phrase in text_lower:
                 indicators['anxiety_indicators'].append(phrase)
+        indicators['anxiety_indicators'].extend(word_set & ANXIETY_WORDS)
         
-        # Anxiety words
-        anxiety_words = {'anxious', 'anxiety', 'worried', 'panic', 'nervous', 'stressed'}
-        indicators['anxiety_indicators'].extend(list(set(words) & anxiety_words))
-        
-        # Crisis indicators (already handled by crisis_detection.py but included here)
-        crisis_words = {'suicide', 'suicidal', 'kill myself', 'end my life', 'self-harm', 'hurt myself'}
-        for word in crisis_words:
-            if word in text_lower:
-                indicators['crisis_indicators'].append(word)
+        # Crisis indicators
+        for term in CRISIS_TERMS:
+            if term in text_lower:
+                indicators['crisis_indicators'].append(term)
         
         # Positive indicators
-        positive_phrases = [
-            'feeling better', 'getting better', 'making progress', 'feeling good',
-            'feeling happy', 'feeling hopeful', 'things are improving', 'im okay', "i'm okay"
-        ]
-        
-        for phrase in positive_phrases:
+        for phrase in POSITIVE_PHRASES:
             if phrase in text_lower:
                 indicators['positive_indicators'].append(phrase)
-        
-        positive_words = {'better', 'improving', 'hopeful', 'progress', 'happy', 'good'}
-        indicators['positive_indicators'].extend(list(set(words) & positive_words))
+        indicators['positive_indicators'].extend(word_set & POSITIVE_INDICATOR_WORDS)
         
         # Determine risk level
         if indicators['crisis_indicators']:
@@ -312,13 +318,15 @@ class SentimentAnalyzer:
         Perform full sentiment and emotion analysis
         Returns comprehensive analysis results
         """
-        sentiment = self.analyze_sentiment(text)
-        emotions = self.analyze_emotions(text)
-        mh_indicators = self.get_mental_health_indicators(text)
+        # Tokenize once and share the tokens across the three analyses
+        words = self.preprocess_text(text)
+        sentiment = self.analyze_sentiment(text, words)
+        emotions = self.analyze_emotions(text, words)
+        mh_indicators = self.get_mental_health_indicators(text, words)
         
         return {
             'text_length': len(text),
-            'word_count': len(self.preprocess_text(text)),
+            'word_count': len(words),
             'sentiment': sentiment,
             'emotions': emotions,
             'mental_health_indicators': mh_indicators,
@@ -18,6 +18,7 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from prompts import build_prompt
+from chatbot import get_groq_http_client
 
 
 class StreamingCallbackHandler(BaseCallbackHandler):
@@ -57,7 +58,8 @@ class StreamingLLMChain:
             model_name="llama-3.3-70b-versatile",
             max_tokens=max_tokens,
             streaming=True,
-            callbacks=[callback_handler]
+            callbacks=[callback_handler],
+            http_client=get_groq_http_client()  # reuse warm connections instead of a new client per stream
         )
 
     def create_gemini_llm(self, callback_handler: StreamingCallbackHandler, max_tokens: int = 300):
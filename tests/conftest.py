@@ -0,0 +1,48 @@
+"""
+Shared test setup: every test session runs against a throwaway working directory,
+so database.DB_PATH (data/mental_health.db) and the log files never touch the repo.
+"""
+
+import atexit
+import itertools
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Must happen before database/error_handler are imported: both create their
+# directories relative to the working directory at import time
+WORK_DIR = tempfile.mkdtemp(prefix='mindspace-tests-')
+os.chdir(WORK_DIR)
+atexit.register(shutil.rmtree, WORK_DIR, ignore_errors=True)
+
+_user_ids = itertools.count(1000)
+
+
+@pytest.fixture(scope='session')
+def db():
+    """The initialized test database module"""
+    import database
+    database.init_db()
+    return database
+
+
+@pytest.fixture
+def user_id(db):
+    """A user id no other test has written rows for"""
+    return next(_user_ids)
+
+
+@pytest.fixture
+def conn(db):
+    """A plain read/write connection to the test database"""
+    connection = sqlite3.connect(db.DB_PATH)
+    connection.row_factory = sqlite3.Row
+    yield connection
+    connection.close()
@@ -0,0 +1,190 @@
+"""Tests for the analytics queries, run against rows dated relative to now"""
+
+import pytest
+
+
+@pytest.fixture
+def analytics(db):
+    import analytics
+    return analytics
+
+
+def _days_ago(conn, days):
+    return conn.execute("SELECT datetime('now', ?)", (f'-{days} days',)).fetchone()[0]
+
+
+def _add_assessments(conn, user_id, assessment_type, scores_by_age):
+    for days, score in scores_by_age:
+        conn.execute('''
+            INSERT INTO assessment_results (user_id, assessment_type, score, severity, answers, created_at)
+            VALUES (?, ?, ?, ?, '', ?)
+        ''', (user_id, assessment_type, score, f'severity {score}', _days_ago(conn, days)))
+    conn.commit()
+
+
+def _add_crisis(conn, user_id, days, level, triggers):
+    conn.execute('''
+        INSERT INTO crisis_events (user_id, message, crisis_level, severity, triggers, created_at)
+        VALUES (?, 'message', ?, 5, ?, ?)
+    ''', (user_id, level, triggers, _days_ago(conn, days)))
+    conn.commit()
+
+
+def _add_chat(conn, user_id, days, message):
+    conn.execute(
+        'INSERT INTO chat_history (user_id, message, response, created_at) VALUES (?, ?, ?, ?)',
+        (user_id, message, 'reply', _days_ago(conn, days))
+    )
+    conn.commit()
+
+
+def test_assessment_trends_in_time_order(analytics, conn, user_id):
+    # Inserted out of order, plus one outside the 30-day window
+    _add_assessments(conn, user_id, 'phq9', [(5, 15), (10, 20), (40, 27), (1, 8), (3, 10)])
+
+    trends = analytics.get_assessment_trends(user_id, 'phq9')
+
+    assert [row['score'] for row in trends['data']] == [20, 15, 10, 8]
+    assert trends['total_assessments'] == 4
+    assert trends['trend_direction'] == 'improving'
+
+    summary = analytics.get_assessment_trends(user_id, 'phq9', include_data=False)
+    assert 'data' not in summary
+    assert summary['trend_direction'] == 'improving'
+    assert summary['total_assessments'] == 4
+
+
+def test_assessment_trend_directions(analytics, conn, user_id):
+    assert analytics.get_assessment_trends(user_id, 'gad7')['trend_direction'] == 'insufficient_data'
+
+    _add_assessments(conn, user_id, 'gad7', [(4, 6)])
+    assert analytics.get_assessment_trends(user_id, 'gad7')['trend_direction'] == 'insufficient_data'
+
+    # With fewer than six rows the first-three and last-three windows overlap
+    _add_assessments(conn, user_id, 'gad7', [(3, 6)])
+    assert analytics.get_assessment_trends(user_id, 'gad7')['trend_direction'] == 'stable'
+
+    _add_assessments(conn, user_id, 'gad7', [(2, 9), (1, 12)])
+    assert analytics.get_assessment_trends(user_id, 'gad7')['trend_direction'] == 'worsening'
+
+
+def test_crisis_patterns(analytics, conn, user_id):
+    _add_crisis(conn, user_id, 3, 'high', 'hopeless, alone')
+    _add_crisis(conn, user_id, 2, 'medium', 'alone')
+    _add_crisis(conn, user_id, 1, 'high', 'alone,pain')
+    _add_crisis(conn, user_id, 1, 'low', '')
+    _add_crisis(conn, user_id, 60, 'high', 'old')
+
+    patterns = analytics.get_crisis_patterns(user_id)
+
+    assert patterns['total_events'] == 4
+    assert patterns['severity_distribution'] == {'high': 2, 'medium': 1, 'low': 1}
+    # Ties keep first-seen order: newest event first, then position in its list
+    assert patterns['common_triggers'] == [
+        {'trigger': 'alone', 'count': 3},
+        {'trigger': 'pain', 'count': 1},
+        {'trigger': 'hopeless', 'count': 1},
+    ]
+    assert [e['level'] for e in patterns['recent_events']][2:] == ['medium', 'high']
+
+
+def test_crisis_patterns_without_events(analytics, user_id):
+    assert analytics.get_crisis_patterns(user_id) == {
+        'total_events': 0,
+        'severity_distribution': {},
+        'common_triggers': [],
+        'recent_events': []
+    }
+
+
+def test_engagement_metrics(analytics, conn, user_id):
+    _add_chat(conn, user_id, 2, 'a' * 30)
+    _add_chat(conn, user_id, 1, 'b' * 10)
+    _add_chat(conn, user_id, 1, 'c' * 20)
+    _add_chat(conn, user_id, 20, 'd' * 40)  # counts toward totals, not daily activity
+
+    metrics = analytics.get_engagement_metrics(user_id)
+
+    assert [day['messages'] for day in metrics['daily_activity']] == [1, 2]
+    assert metrics['daily_activity'][0]['date'] < metrics['daily_activity'][1]['date']
+    assert metrics['total_recent_messages'] == 4
+    assert metrics['avg_message_length'] == 25.0
+    assert metrics['engagement_score'] == analytics._calculate_engagement_score(
+        4, metrics['daily_activity'], 25.0)
+    assert analytics.get_engagement_scores([user_id]) == {user_id: metrics['engagement_score']}
+
+
+def test_engagement_scores_for_unknown_users(analytics, user_id):
+    assert analytics.get_engagement_scores([]) == {}
+    assert analytics.get_engagement_scores([user_id]) == {user_id: 0}
+
+
+def test_user_stats_bulk_matches_single(analytics, conn, user_id):
+    other_user = user_id + 100000
+    _add_chat(conn, user_id, 3, 'hello')
+    _add_chat(conn, user_id, 1, 'again')
+    _add_assessments(conn, user_id, 'phq9', [(2, 9)])
+    _add_crisis(conn, user_id, 1, 'low', '')
+
+    stats = analytics.get_user_stats(user_id)
+    assert stats['total_conversations'] == 2
+    assert stats['total_assessments'] == 1
+    assert stats['crisis_events'] == 1
+    assert stats['latest_phq9']['score'] == 9
+    assert stats['latest_gad7'] == {'score': None, 'date': None}
+    assert stats['days_active'] == 2
+
+    bulk = analytics.get_user_stats_bulk([user_id, other_user])
+    assert bulk[user_id] == stats
+    assert bulk[other_user] == analytics.get_user_stats(other_user)
+    assert bulk[other_user]['total_conversations'] == 0
+
+
+def test_mental_health_trajectory(analytics, conn, user_id):
+    _add_assessments(conn, user_id, 'phq9', [(60, 20), (50, 18), (40, 12), (30, 10)])
+    _add_assessments(conn, user_id, 'gad7', [(60, 5), (50, 6), (40, 10), (30, 15)])
+    _add_crisis(conn, user_id, 10, 'medium', '')
+
+    assert analytics.get_mental_health_trajectory(user_id) == {
+        'trajectory_score': 45,
+        'phq9_trend': 'improving',
+        'gad7_trend': 'worsening',
+        'crisis_frequency': 1,
+        'overall_status': 'Stable'
+    }
+
+
+def test_system_analytics_matches_table_counts(analytics, db, conn, user_id):
+    db.save_chat_message(user_id, 'hello', 'reply')
+    analytics.invalidate(user_id)
+
+    system = analytics.get_system_analytics()
+
+    for key, table in (('total_users', 'users'),
+                       ('total_conversations', 'chat_history'),
+                       ('total_assessments', 'assessment_results'),
+                       ('total_crisis_events', 'crisis_events')):
+        assert system[key] == conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+
+
+def test_invalidate_exposes_new_rows(analytics, db, user_id):
+    db.save_chat_message(user_id, 'hello', 'reply')
+    assert analytics.get_user_stats(user_id)['total_conversations'] == 1
+
+    db.save_chat_message(user_id, 'again', 'reply')
+    assert analytics.get_user_stats(user_id)['total_conversations'] == 1  # still cached
+
+    analytics.invalidate(user_id)
+    assert analytics.get_user_stats(user_id)['total_conversations'] == 2
+
+
+def test_cached_results_are_copies(analytics, db, user_id):
+    db.save_chat_message(user_id, 'hello', 'reply')
+
+    stats = analytics.get_user_stats(user_id)
+    stats['total_conversations'] = 999
+    stats['latest_phq9']['score'] = 999
+
+    fresh = analytics.get_user_stats(user_id)
+    assert fresh['total_conversations'] == 1
+    assert fresh['latest_phq9']['score'] is None
@@ -0,0 +1,112 @@
+"""Tests for how /ask uses the shared semantic response cache (LLM and embedder faked)"""
+
+import zlib
+
+import numpy as np
+import pytest
+
+app_module = pytest.importorskip('app')
+
+from cache_manager import SemanticCache
+
+
+class WordEmbeddings:
+    """Bag-of-words vectors: identical wording embeds identically"""
+    
+    def embed_query(self, text):
+        vec = np.zeros(256, dtype=np.float32)
+        for word in text.lower().split():
+            vec[zlib.crc32(word.encode()) % 256] += 1
+        return vec
+
+
+class EchoQAChain:
+    """Answers with the exact prompt it was given, so any user context it saw shows up"""
+    
+    def run(self, query, conversation_history="", return_sources=False):
+        answer = f"answer to <{query}> with history <{conversation_history}>"
+        return (answer, []) if return_sources else answer
+    
+    def stream(self, query, conversation_history=""):
+        yield self.run(query, conversation_history)
+
+
+@pytest.fixture
+def semantic_cache(db, monkeypatch):
+    semantic_cache = SemanticCache(WordEmbeddings())
+    monkeypatch.setattr(app_module, 'get_semantic_cache', lambda: semantic_cache)
+    monkeypatch.setattr(app_module, 'get_qa_chain', lambda: EchoQAChain())
+    return semantic_cache
+
+
+def _client_for(user_id):
+    client = app_module.app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = user_id
+    return client
+
+
+def _ask(client, query):
+    response = client.post('/ask', data={'query': query})
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_answers_with_history_are_not_shared(semantic_cache, user_id):
+    alice = _client_for(user_id)
+    bob = _client_for(user_id + 100000)
+
+    _ask(alice, 'what should someone do after losing a job at the bakery')
+    followup = _ask(alice, 'how can sleep be improved')
+    assert 'bakery' in followup['response']
+    assert not followup['cached']
+
+    answer = _ask(bob, 'how can sleep be improved')
+    assert not answer['cached']
+    assert 'bakery' not in answer['response']
+
+
+def test_answers_with_assessment_context_are_not_shared(semantic_cache, db, user_id):
+    db.save_assessment_result(user_id, 'phq9', 22, 'Severe', [3] * 9)
+    alice = _client_for(user_id)
+    bob = _client_for(user_id + 100000)
+
+    first = _ask(alice, 'what are good evening routines')
+    assert 'severe symptoms' in first['response']
+
+    answer = _ask(bob, 'what are good evening routines')
+    assert not answer['cached']
+    assert 'severe symptoms' not in answer['response']
+
+
+def test_context_free_answers_are_shared(semantic_cache, user_id):
+    alice = _client_for(user_id)
+    bob = _client_for(user_id + 100000)
+
+    first = _ask(alice, 'what is mindfulness meditation')
+    answer = _ask(bob, 'what is mindfulness meditation')
+
+    assert answer['cached']
+    assert answer['response'] == first['response']
+
+
+def test_crisis_message_skips_the_cache(semantic_cache, user_id, monkeypatch):
+    query = 'there is no point, want to end it all'
+    semantic_cache.set(query, 'cached answer')
+    crisis_events = []
+    monkeypatch.setattr(app_module, 'queue_crisis_event',
+                        lambda *args: crisis_events.append(args))
+
+    answer = _ask(_client_for(user_id), query)
+
+    assert answer['crisis_detected']
+    assert 'cached answer' not in answer['response']
+    assert len(crisis_events) == 1
+
+
+def test_first_person_wording_alone_does_not_block_caching(semantic_cache, user_id):
+    first = _ask(_client_for(user_id), 'I feel nervous before my exams')
+    answer = _ask(_client_for(user_id + 100000), 'I feel nervous before my exams')
+
+    assert answer['cached']
+    assert answer['response'] == first['response']
@@ -0,0 +1,49 @@
+"""Tests for the require_auth decorator"""
+
+import pytest
+from flask import Flask, g, jsonify
+
+
+@pytest.fixture
+def client(db):
+    from auth import require_auth
+
+    app = Flask(__name__)
+    app.secret_key = 'test-secret'
+
+    @app.route('/protected')
+    @require_auth
+    def protected():
+        return jsonify({'user_id': g.user_id})
+
+    return app.test_client()
+
+
+def test_request_without_session_cookie_is_rejected(client):
+    response = client.get('/protected')
+    assert response.status_code == 401
+    assert response.get_json() == {'error': 'Not authenticated'}
+
+
+def test_session_without_user_is_rejected(client):
+    with client.session_transaction() as sess:
+        sess['theme'] = 'dark'
+
+    response = client.get('/protected')
+    assert response.status_code == 401
+
+
+def test_tampered_session_cookie_is_rejected(client):
+    client.set_cookie('session', 'not-a-signed-session')
+
+    response = client.get('/protected')
+    assert response.status_code == 401
+
+
+def test_logged_in_user_is_exposed_on_g(client):
+    with client.session_transaction() as sess:
+        sess['user_id'] = 42
+
+    response = client.get('/protected')
+    assert response.status_code == 200
+    assert response.get_json() == {'user_id': 42}
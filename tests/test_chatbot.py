@@ -0,0 +1,145 @@
+"""Tests for DualLLMChain hedging and QAChainPool borrow/return (no real LLMs involved)"""
+
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+chatbot = pytest.importorskip('chatbot')
+
+
+class FakeChain:
+    """Stands in for a RetrievalQA chain: answers invoke() and exposes the pieces _stream_chain uses"""
+    
+    def __init__(self, answer='answer', error=None, delay=0.0, chunks=None):
+        self.answer = answer
+        self.error = error
+        self.delay = delay
+        self.calls = 0
+        self.retriever = SimpleNamespace(invoke=lambda query: [])
+        self.combine_documents_chain = SimpleNamespace(llm_chain=SimpleNamespace(
+            prompt=SimpleNamespace(format=lambda context, question: question),
+            llm=SimpleNamespace(stream=self._stream)
+        ))
+        self._chunks = chunks if chunks is not None else [answer]
+        self._release = threading.Event()
+    
+    def invoke(self, inputs):
+        self.calls += 1
+        if self.delay:
+            self._release.wait(self.delay)
+        if self.error:
+            raise self.error
+        return {'result': self.answer, 'source_documents': [f'doc for {inputs["query"]}']}
+    
+    def _stream(self, prompt):
+        if self.error:
+            raise self.error
+        for text in self._chunks:
+            yield SimpleNamespace(content=text)
+
+
+FALLBACK = 'fallback response'
+
+
+def _dual_chain(monkeypatch, *args, **kwargs):
+    chain = chatbot.DualLLMChain(*args, **kwargs)
+    monkeypatch.setattr(chain, '_get_fallback_response', lambda: FALLBACK)
+    return chain
+
+
+def test_primary_answer_wins_when_fast():
+    primary, secondary = FakeChain('from primary'), FakeChain('from secondary')
+    chain = chatbot.DualLLMChain(primary, secondary, hedge_delay=5)
+
+    assert chain.run('hi', return_sources=True) == ('from primary', ['doc for hi'])
+    assert secondary.calls == 0
+
+
+def test_failed_primary_falls_back_to_secondary():
+    primary = FakeChain(error=RuntimeError('rate limited'))
+    chain = chatbot.DualLLMChain(primary, FakeChain('from secondary'), hedge_delay=5)
+
+    assert chain.run('hi') == 'from secondary'
+    assert chain.primary_failures == 1
+
+
+def test_slow_primary_is_hedged_with_secondary():
+    primary = FakeChain('from primary', delay=5)
+    chain = chatbot.DualLLMChain(primary, FakeChain('from secondary'), hedge_delay=0.05)
+    try:
+        assert chain.run('hi') == 'from secondary'
+    finally:
+        primary._release.set()
+
+
+def test_both_failing_returns_fallback(monkeypatch):
+    chain = _dual_chain(monkeypatch, FakeChain(error=RuntimeError('down')),
+                        FakeChain(error=RuntimeError('down')), hedge_delay=5)
+
+    assert chain.run('hi', return_sources=True) == (FALLBACK, [])
+
+
+def test_primary_only_failure_returns_fallback(monkeypatch):
+    chain = _dual_chain(monkeypatch, FakeChain(error=RuntimeError('down')))
+
+    assert chain.run('hi') == FALLBACK
+    assert chain.primary_failures == 1
+
+
+def test_stream_strips_role_prefix_and_falls_back_before_first_token():
+    secondary = FakeChain(chunks=['Serene: hello ', 'there, how ', 'are you?'])
+    chain = chatbot.DualLLMChain(FakeChain(error=RuntimeError('down')), secondary)
+
+    assert ''.join(chain.stream('hi')) == 'hello there, how are you?'
+
+
+def test_stream_falls_back_when_every_chain_fails(monkeypatch):
+    chain = _dual_chain(monkeypatch, FakeChain(error=RuntimeError('down')),
+                        FakeChain(error=RuntimeError('down')))
+
+    assert list(chain.stream('hi')) == [FALLBACK]
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    chains = []
+
+    def setup_qa_chain(vector_db, llm):
+        chains.append(FakeChain(f'answer from {llm}'))
+        return chains[-1]
+
+    monkeypatch.setattr(chatbot, 'initialize_llm', lambda verbose=False: ('groq', None))
+    monkeypatch.setattr(chatbot, 'setup_qa_chain', setup_qa_chain)
+    pool = chatbot.QAChainPool(vector_db=object(), size=2)
+    pool.fake_chains = chains
+    return pool
+
+
+def test_pool_builds_one_chain_per_slot(pool):
+    assert pool.size == 2
+    assert pool._chains.qsize() == 2
+    assert pool.primary_available and not pool.secondary_available
+
+
+def test_pool_returns_chain_after_run(pool):
+    assert pool.run('hi') == 'answer from groq'
+    assert pool._chains.qsize() == 2
+
+
+def test_pool_returns_chain_after_failed_run(pool, monkeypatch):
+    borrowed = pool._chains.queue[0]
+    monkeypatch.setattr(borrowed, 'run', lambda *args, **kwargs: 1 / 0)
+
+    with pytest.raises(ZeroDivisionError):
+        pool.run('hi')
+    assert pool._chains.qsize() == 2
+
+
+def test_pool_stream_holds_chain_until_generator_closes(pool):
+    stream = pool.stream('hi')
+    assert next(stream) == 'answer from groq'
+    assert pool._chains.qsize() == 1
+
+    stream.close()
+    assert pool._chains.qsize() == 2
@@ -0,0 +1,37 @@
+"""Tests for ConversationContextBuilder's prompt personalization"""
+
+import pytest
+
+
+@pytest.fixture
+def builder(db):
+    from conversation_memory import ConversationContextBuilder
+    return ConversationContextBuilder
+
+
+def test_new_user_prompt_is_not_personalized(builder, user_id):
+    history, prompt = builder.build(user_id, 'what is mindfulness')
+
+    assert history == 'No previous conversation.'
+    assert not builder.is_personalized('what is mindfulness', prompt)
+
+
+def test_history_personalizes_prompt(builder, user_id):
+    from conversation_memory import memory_manager
+    memory_manager.add_exchange(user_id, 'hello there', 'hi, how are you?')
+
+    _, prompt = builder.build(user_id, 'what is mindfulness')
+
+    assert 'hello there' in prompt
+    assert builder.is_personalized('what is mindfulness', prompt)
+
+
+@pytest.mark.parametrize('severity, personalized', [
+    ('Severe', True), ('Moderate', True), ('Mild', False),
+])
+def test_assessment_note_personalizes_prompt(builder, db, user_id, severity, personalized):
+    db.save_assessment_result(user_id, 'gad7', 10, severity, [1] * 7)
+
+    _, prompt = builder.build(user_id, 'what is mindfulness')
+
+    assert builder.is_personalized('what is mindfulness', prompt) is personalized
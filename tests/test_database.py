@@ -0,0 +1,131 @@
+"""Tests for the analytics roll-up tables and the triggers that maintain them"""
+
+
+def _summary(conn, user_id):
+    row = conn.execute(
+        'SELECT * FROM analytics_user_summary WHERE user_id = ?', (user_id,)
+    ).fetchone()
+    return dict(row) if row else None
+
+
+def _counters(conn):
+    return dict(conn.execute('SELECT * FROM analytics_counters WHERE id = 1').fetchone())
+
+
+def _add_chat(conn, user_id, message, created_at):
+    conn.execute(
+        'INSERT INTO chat_history (user_id, message, response, created_at) VALUES (?, ?, ?, ?)',
+        (user_id, message, 'reply', created_at)
+    )
+    conn.commit()
+
+
+def _add_assessment(conn, user_id, assessment_type, score, created_at):
+    conn.execute('''
+        INSERT INTO assessment_results (user_id, assessment_type, score, severity, answers, created_at)
+        VALUES (?, ?, ?, 'Mild', '1,1', ?)
+    ''', (user_id, assessment_type, score, created_at))
+    conn.commit()
+
+
+def test_chat_insert_and_delete_update_summary(conn, user_id):
+    _add_chat(conn, user_id, 'hello', '2024-01-02 10:00:00')
+    _add_chat(conn, user_id, 'hi', '2024-01-01 09:00:00')
+    _add_chat(conn, user_id, 'later', '2024-01-03 11:00:00')
+
+    summary = _summary(conn, user_id)
+    assert summary['total_conversations'] == 3
+    assert summary['total_message_chars'] == len('hello') + len('hi') + len('later')
+    assert summary['first_interaction'] == '2024-01-01 09:00:00'
+    assert summary['last_interaction'] == '2024-01-03 11:00:00'
+
+    conn.execute("DELETE FROM chat_history WHERE user_id = ? AND message = 'later'", (user_id,))
+    conn.commit()
+
+    summary = _summary(conn, user_id)
+    assert summary['total_conversations'] == 2
+    assert summary['total_message_chars'] == len('hello') + len('hi')
+    assert summary['last_interaction'] == '2024-01-02 10:00:00'
+
+
+def test_latest_scores_follow_created_at(conn, user_id):
+    _add_assessment(conn, user_id, 'phq9', 12, '2024-02-02 10:00:00')
+    # Inserted later but older: must not replace the latest score
+    _add_assessment(conn, user_id, 'phq9', 20, '2024-02-01 10:00:00')
+    _add_assessment(conn, user_id, 'gad7', 7, '2024-02-03 10:00:00')
+
+    summary = _summary(conn, user_id)
+    assert summary['total_assessments'] == 3
+    assert (summary['last_phq9_score'], summary['last_phq9_at']) == (12, '2024-02-02 10:00:00')
+    assert (summary['last_gad7_score'], summary['last_gad7_at']) == (7, '2024-02-03 10:00:00')
+
+    conn.execute('DELETE FROM assessment_results WHERE user_id = ? AND score = 12', (user_id,))
+    conn.commit()
+
+    summary = _summary(conn, user_id)
+    assert summary['total_assessments'] == 2
+    assert (summary['last_phq9_score'], summary['last_phq9_at']) == (20, '2024-02-01 10:00:00')
+
+    conn.execute("DELETE FROM assessment_results WHERE user_id = ? AND assessment_type = 'gad7'",
+                 (user_id,))
+    conn.commit()
+    assert _summary(conn, user_id)['last_gad7_score'] is None
+
+
+def test_crisis_events_counted(db, conn, user_id):
+    db.save_crisis_event(user_id, 'message', 'high', 8, ['hopeless'])
+    db.save_crisis_event(user_id, 'message', 'low', 2, [])
+    assert _summary(conn, user_id)['crisis_events'] == 2
+
+    conn.execute('DELETE FROM crisis_events WHERE user_id = ? AND severity = 2', (user_id,))
+    conn.commit()
+    assert _summary(conn, user_id)['crisis_events'] == 1
+
+
+def test_counters_track_row_counts(db, conn, user_id):
+    before = _counters(conn)
+    db.save_chat_message(user_id, 'hello', 'reply')
+    db.save_assessment_result(user_id, 'phq9', 5, 'Mild', [1, 1, 1, 1, 1])
+    db.save_crisis_event(user_id, 'message', 'high', 8, [])
+    after = _counters(conn)
+
+    assert after['total_conversations'] == before['total_conversations'] + 1
+    assert after['total_assessments'] == before['total_assessments'] + 1
+    assert after['total_crises'] == before['total_crises'] + 1
+    for table, column in (('users', 'total_users'),
+                          ('chat_history', 'total_conversations'),
+                          ('assessment_results', 'total_assessments'),
+                          ('crisis_events', 'total_crises')):
+        assert after[column] == conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+
+
+def test_backfill_matches_trigger_maintained_rows(db, conn, user_id):
+    _add_chat(conn, user_id, 'first', '2024-03-01 10:00:00')
+    _add_chat(conn, user_id, 'second', '2024-03-02 10:00:00')
+    _add_assessment(conn, user_id, 'phq9', 9, '2024-03-01 12:00:00')
+    _add_assessment(conn, user_id, 'gad7', 4, '2024-03-02 12:00:00')
+    db.save_crisis_event(user_id, 'message', 'medium', 5, [])
+
+    summaries = [dict(r) for r in conn.execute(
+        'SELECT * FROM analytics_user_summary ORDER BY user_id')]
+    counters = _counters(conn)
+
+    conn.execute('DROP TABLE analytics_user_summary')
+    conn.execute('DROP TABLE analytics_counters')
+    conn.commit()
+    db.init_db()
+
+    assert [dict(r) for r in conn.execute(
+        'SELECT * FROM analytics_user_summary ORDER BY user_id')] == summaries
+    assert _counters(conn) == counters
+
+
+def test_init_db_is_idempotent(db, conn, user_id):
+    _add_chat(conn, user_id, 'hello', '2024-04-01 10:00:00')
+    summary = _summary(conn, user_id)
+    counters = _counters(conn)
+
+    db.init_db()
+
+    assert _summary(conn, user_id) == summary
+    assert _counters(conn) == counters
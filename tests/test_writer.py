@@ -0,0 +1,88 @@
+"""Tests for the batched background writer in database.py"""
+
+import logging
+import sqlite3
+
+
+def _messages(conn, user_id):
+    return [r['message'] for r in conn.execute(
+        'SELECT message FROM chat_history WHERE user_id = ? ORDER BY id', (user_id,))]
+
+
+def test_queued_rows_are_persisted(db, conn, user_id):
+    for i in range(5):
+        db.queue_chat_message(user_id, f'message {i}', 'reply')
+    db.flush_writes()
+
+    assert _messages(conn, user_id) == [f'message {i}' for i in range(5)]
+
+
+def test_queued_message_touches_its_session(db, conn, user_id):
+    session_id = db.create_chat_session(user_id)
+    conn.execute("UPDATE chat_sessions SET updated_at = '2000-01-01 00:00:00' WHERE id = ?",
+                 (session_id,))
+    conn.commit()
+
+    db.queue_chat_message(user_id, 'hello', 'reply', session_id)
+    db.flush_writes()
+
+    assert _messages(conn, user_id) == ['hello']
+    updated_at = conn.execute('SELECT updated_at FROM chat_sessions WHERE id = ?',
+                              (session_id,)).fetchone()[0]
+    assert updated_at > '2000-01-01 00:00:00'
+
+
+def test_bad_row_is_dropped_without_losing_the_batch(db, conn, user_id, caplog):
+    batch = [
+        (db._ROW, db._INSERT_CHAT_MESSAGE, (user_id, 'before', 'reply', None)),
+        (db._ROW, db._INSERT_CHAT_MESSAGE, (user_id, None, 'reply', None)),  # NOT NULL
+        (db._ROW, db._INSERT_CHAT_MESSAGE, (user_id, 'after', 'reply', None)),
+    ]
+    writer_conn = sqlite3.connect(db.DB_PATH)
+    try:
+        with caplog.at_level(logging.ERROR):
+            db._apply_writes(writer_conn, batch)
+    finally:
+        writer_conn.close()
+
+    assert _messages(conn, user_id) == ['before', 'after']
+    assert 'row dropped' in caplog.text
+
+
+def test_callables_run_after_rows_commit(db, conn, user_id):
+    seen = []
+
+    def read_back():
+        with db.db_connection() as c:
+            seen.extend(r['message'] for r in c.execute(
+                'SELECT message FROM chat_history WHERE user_id = ?', (user_id,)))
+
+    # Queued ahead of the row, but the batch commits its rows first
+    batch = [
+        (read_back, (), {}),
+        (db._ROW, db._INSERT_CHAT_MESSAGE, (user_id, 'hello', 'reply', None)),
+    ]
+    writer_conn = sqlite3.connect(db.DB_PATH)
+    try:
+        db._apply_writes(writer_conn, batch)
+    finally:
+        writer_conn.close()
+
+    assert seen == ['hello']
+
+
+def test_failing_callable_does_not_stop_the_writer(db, conn, user_id, caplog):
+    calls = []
+
+    def broken():
+        raise RuntimeError('boom')
+
+    with caplog.at_level(logging.ERROR):
+        db.enqueue_write(broken)
+        db.enqueue_write(calls.append, 'ran')
+        db.queue_chat_message(user_id, 'still written', 'reply')
+        db.flush_writes()
+
+    assert calls == ['ran']
+    assert _messages(conn, user_id) == ['still written']
+    assert 'Background write broken failed' in caplog.text
@@ -10,10 +10,8 @@ from datetime import datetime
 from typing import Dict, Optional
 import threading
 
-from database import save_chat_message, get_chat_history
+from database import get_chat_history
 from conversation_memory import memory_manager, ConversationContextBuilder
-from sentiment_analysis import SentimentAnalyzer
-from crisis_detection import CrisisDetector
 from error_handler import logger
 
 
@@ -100,23 +98,22 @@ def register_handlers():
         
         try:
             # Import here to avoid circular imports
-            from app import qa_chain, sentiment_analyzer
+            from app import get_qa_chain, sentiment_analyzer, crisis_detector, save_exchange
             
             # Analyze sentiment
             sentiment_result = sentiment_analyzer.full_analysis(message)
             
             # Check for crisis
-            crisis_detector = CrisisDetector()
             crisis_info = crisis_detector.detect_crisis(message)
             
             # Get conversation context
             conversation_history = ConversationContextBuilder.get_conversation_history(user_id)
             
             # Get AI response
-            response = qa_chain.run(message, conversation_history=conversation_history)
+            response = get_qa_chain().run(message, conversation_history=conversation_history)
             
-            # Save to database
-            save_chat_message(user_id, message, response, chat_session_id)
+            # Save to database (batched background write; analytics are invalidated after it commits)
+            save_exchange(user_id, message, response, chat_session_id)
             
             # Update memory
             memory_manager.add_exchange(user_id, message, response)